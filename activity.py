@@ -0,0 +1,52 @@
+import time
+from typing import List, Optional
+
+BUCKET_SECONDS = 10
+BUCKET_COUNT = 6
+
+
+class ActivityTracker:
+    """チャンネルの発言数を固定長のスライディングウィンドウで数える
+
+    バケット数は固定なので、発言数やチャンネル数が増えてもメモリは一定。
+    """
+
+    __slots__ = ("bucket_seconds", "counts", "stamps", "started_at")
+
+    def __init__(self, bucket_seconds: int = BUCKET_SECONDS, bucket_count: int = BUCKET_COUNT):
+        self.bucket_seconds = bucket_seconds
+        self.counts: List[int] = [0] * bucket_count
+        # 各スロットが保持しているバケットの通し番号
+        self.stamps: List[int] = [-1] * bucket_count
+        self.started_at = time.monotonic()
+
+    @property
+    def window_seconds(self) -> int:
+        return self.bucket_seconds * len(self.counts)
+
+    def record(self, now: Optional[float] = None):
+        """発言を1件記録"""
+        now = time.monotonic() if now is None else now
+        index = int(now // self.bucket_seconds)
+        slot = index % len(self.counts)
+        if self.stamps[slot] != index:
+            self.stamps[slot] = index
+            self.counts[slot] = 0
+        self.counts[slot] += 1
+
+    def count(self, now: Optional[float] = None) -> int:
+        """ウィンドウ内の発言数"""
+        now = time.monotonic() if now is None else now
+        oldest = int(now // self.bucket_seconds) - len(self.counts) + 1
+        return sum(c for c, stamp in zip(self.counts, self.stamps) if stamp >= oldest)
+
+    def rate_per_minute(self, now: Optional[float] = None) -> float:
+        """ウィンドウ内の1分あたりの発言数"""
+        return self.count(now) * 60 / self.window_seconds
+
+    def is_quiet(self, threshold_per_minute: float, now: Optional[float] = None) -> bool:
+        """ウィンドウ1つ分以上計測した上で、発言ペースが閾値を下回っているか"""
+        now = time.monotonic() if now is None else now
+        if now - self.started_at < self.window_seconds:
+            return False
+        return self.rate_per_minute(now) < threshold_per_minute
@@ -0,0 +1,74 @@
+"""埋め込み生成のベンチマーク
+
+大人数・長いログのゲームで結果/ステータス/投票の埋め込みを生成し、
+1プレイヤーあたりの所要時間とDiscordの制限を満たしているかを確認する。
+
+    python bench_embeds.py
+"""
+import time
+
+from game_manager import GameState, PlayerState, Role, GamePhase
+from message_manager import (
+    MessageManager,
+    EmbedBuilder,
+    FIELD_VALUE_LIMIT,
+    EMBED_FIELD_COUNT_LIMIT,
+    EMBED_TOTAL_LIMIT,
+    MESSAGE_EMBED_LIMIT,
+)
+
+PLAYER_COUNTS = [20, 100, 1000, 5000]
+REPEAT = 20
+
+
+def make_game(player_count: int) -> GameState:
+    game_state = GameState(creator_id=1, channel_id=1)
+    roles = list(Role)
+    for i in range(player_count):
+        # 実際のIDと同じ長さ(18〜19桁)のメンション
+        player_id = 10 ** 18 + i
+        game_state.players[player_id] = PlayerState(
+            member_id=player_id,
+            role=roles[i % len(roles)],
+            is_alive=i % 3 != 0
+        )
+        game_state.add_log(f"プレイヤー <@{player_id}> が投票により処刑されました" * 3)
+    game_state.phase = GamePhase.DAY
+    return game_state
+
+
+def check_limits(embeds):
+    for embed in embeds:
+        assert len(embed.fields) <= EMBED_FIELD_COUNT_LIMIT
+        assert len(embed) <= EMBED_TOTAL_LIMIT
+        for field in embed.fields:
+            assert len(field.value) <= FIELD_VALUE_LIMIT
+    for batch in EmbedBuilder.pack_messages(embeds):
+        assert len(batch) <= MESSAGE_EMBED_LIMIT
+        assert sum(len(e) for e in batch) <= EMBED_TOTAL_LIMIT
+
+
+def bench(name, player_count, build):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        embeds = build()
+    elapsed = (time.perf_counter() - start) / REPEAT
+    check_limits(embeds)
+    messages = len(EmbedBuilder.pack_messages(embeds))
+    print(
+        f"{name:<8} players={player_count:<5} {elapsed * 1000:8.2f} ms "
+        f"{elapsed / player_count * 1e6:6.2f} us/player "
+        f"embeds={len(embeds):<4} messages={messages}"
+    )
+
+
+def main():
+    for player_count in PLAYER_COUNTS:
+        game_state = make_game(player_count)
+        bench("result", player_count, lambda: MessageManager.create_game_result_embeds(game_state, "村人陣営"))
+        bench("status", player_count, lambda: MessageManager.create_game_status_embeds(game_state))
+        bench("voting", player_count, lambda: MessageManager.create_voting_embeds(game_state))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""高速化オプションの比較ベンチマーク
+
+オプション無効(install(False))と有効(install(True))のそれぞれを別プロセスで実行し、
+ゲートウェイイベントの処理量とインタラクション応答の遅延を比べる。
+JSONの実装はどちらもdiscord.pyの既定(orjsonがあればorjson)で、差はイベントループのみ。
+"gateway"はJSONのデコードとキュー経由の受け渡しだけを計測しており、
+discord.pyのイベント解析は含まない。
+
+    python bench_speedups.py
+"""
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+import discord.utils
+
+import speedups
+
+GATEWAY_EVENTS = 50000
+INTERACTIONS = 20000
+CONCURRENCY = 200
+
+
+def make_payloads():
+    """ゲートウェイから届く代表的なペイロード"""
+    user = {"id": "123456789012345678", "username": "player", "global_name": "プレイヤー", "avatar": None}
+    message = {
+        "op": 0, "s": 1, "t": "MESSAGE_CREATE",
+        "d": {
+            "id": "123456789012345679", "channel_id": "123456789012345680",
+            "guild_id": "123456789012345681", "author": user,
+            "content": "昨日の夜の占い結果について話しましょう" * 3,
+            "timestamp": "2024-01-01T00:00:00.000000+00:00", "mentions": [], "embeds": [],
+            "member": {"roles": [], "joined_at": "2024-01-01T00:00:00.000000+00:00"},
+        },
+    }
+    interaction = {
+        "op": 0, "s": 2, "t": "INTERACTION_CREATE",
+        "d": {
+            "id": "123456789012345682", "application_id": "123456789012345683",
+            "type": 3, "token": "x" * 160, "version": 1,
+            "data": {"custom_id": "vote_123456789012345678", "component_type": 2},
+            "guild_id": "123456789012345681", "channel_id": "123456789012345680",
+            "member": {"user": user, "roles": [], "permissions": "0"},
+            "message": {"id": "123456789012345684", "embeds": [{"title": "投票", "fields": []}]},
+        },
+    }
+    return [json.dumps(message), json.dumps(interaction)]
+
+
+async def bench_gateway(payloads) -> float:
+    """ペイロードをデコードしてキュー経由で処理するイベント数/秒 (イベント解析は含まない)"""
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def consumer():
+        for _ in range(GATEWAY_EVENTS):
+            event = await queue.get()
+            event["d"].get("id")
+
+    task = asyncio.create_task(consumer())
+    start = time.perf_counter()
+    for i in range(GATEWAY_EVENTS):
+        queue.put_nowait(discord.utils._from_json(payloads[i % len(payloads)]))
+        if i % 100 == 0:
+            await asyncio.sleep(0)
+    await task
+    return GATEWAY_EVENTS / (time.perf_counter() - start)
+
+
+async def bench_interactions(payloads):
+    """インタラクションの受信から応答ペイロード生成までの遅延(ミリ秒)"""
+    loop = asyncio.get_running_loop()
+    latencies = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def handle(i):
+        async with semaphore:
+            received = time.perf_counter()
+            event = discord.utils._from_json(payloads[1])
+            # アクター経由の処理を模した1往復
+            future = loop.create_future()
+            loop.call_soon(future.set_result, event["d"]["data"]["custom_id"])
+            custom_id = await future
+            discord.utils._to_json({"type": 4, "data": {"content": custom_id, "flags": 64}})
+            await asyncio.sleep(0)
+            latencies.append((time.perf_counter() - received) * 1000)
+
+    await asyncio.gather(*(handle(i) for i in range(INTERACTIONS)))
+    latencies.sort()
+    return (
+        statistics.median(latencies),
+        latencies[int(len(latencies) * 0.99)],
+    )
+
+
+def run(mode: str):
+    # 基準はオプション無効時にボットが実際に動く状態
+    active = speedups.install(mode == "speedups")
+    payloads = make_payloads()
+
+    async def main():
+        events_per_sec = await bench_gateway(payloads)
+        p50, p99 = await bench_interactions(payloads)
+        return events_per_sec, p50, p99
+
+    events_per_sec, p50, p99 = asyncio.run(main())
+    print(
+        f"{mode:<9} loop={active['loop']:<8} json={active['json']:<7} "
+        f"decode+queue={events_per_sec:>10,.0f} events/s  "
+        f"interaction p50={p50:.3f} ms p99={p99:.3f} ms"
+    )
+
+
+def main():
+    if len(sys.argv) > 1:
+        run(sys.argv[1])
+        return
+    # ループポリシーとJSON実装を切り替えるため、モードごとに別プロセスで実行する
+    for mode in ("baseline", "speedups"):
+        subprocess.run([sys.executable, __file__, mode], check=True)
+
+
+if __name__ == "__main__":
+    main()
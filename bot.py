@@ -1,16 +1,60 @@
+import abc
 import discord
 from discord.ext import commands
 from discord import app_commands
 import asyncio
 from datetime import datetime, timedelta
 import os
+import signal
+import time
+import logging
 from dotenv import load_dotenv
-from game_manager import GameState, GamePhase, Role
-from message_manager import MessageManager
-from typing import Dict, Optional
+from game_manager import (
+    GameState, GamePhase, Role, ROLE_PRESETS, SKIP_DAY_VIEW_ID,
+    get_night_handler, get_role_table, render_night_result
+)
+from message_manager import MessageManager, EmbedBuilder
+from lifecycle_manager import LifecycleManager
+from game_actor import GameActor
+from loop_watchdog import LoopWatchdog, track_view
+from handoff import HandoffManager
+from tracing import start_trace, span, finish_trace
+from activity import ActivityTracker
+from voice_manager import VoiceManager
+from matchmaker import Matchmaker
+from prefetch import PhasePrefetcher
+from preset_store import PresetStore
+import speedups
+from diagnostics import collect_game_diagnostics, top_allocations
+from typing import Dict, List, Optional, Tuple
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# これ以下の人数ならボタンで対象を表示する (5行×5個のうちページ送り行を除く)
+BUTTON_MODE_LIMIT = 20
+# セレクトメニュー1つあたりの選択肢の上限
+SELECT_OPTIONS_LIMIT = 25
+# 1ページに表示するセレクトメニューの対象数 (4メニュー + ページ送り行)
+SELECT_TARGETS_PER_PAGE = SELECT_OPTIONS_LIMIT * 4
+# 参加人数設定の下限と上限
+MIN_PLAYERS_LIMIT = 4
+MAX_PLAYERS_LIMIT = 100
+# チャンネルを作り直せない場合に一括削除するメッセージ数の上限
+CHANNEL_PURGE_LIMIT = 500
+# ゲーム用カテゴリーの名前と、1カテゴリーに置けるチャンネル数の上限
+CATEGORY_NAME = "Werewolf"
+CATEGORY_CHANNEL_LIMIT = 50
+# 1ゲームが使うチャンネル数 (テキスト・ボイスと、開始時に作り直すテキストの分)
+GAME_CHANNEL_SLOTS = 3
+# 昼の議論で直近1分間の発言がこの件数を下回ったら打ち切る
+DAY_QUIET_MESSAGES_PER_MINUTE = 2
+# 昼の議論の終了条件を確認する間隔
+DAY_POLL_SECONDS = 5
+# 終了済みのゲームのビューが操作された場合の応答
+GAME_ENDED_MESSAGE = "このゲームはすでに終了しています。"
+
 class WerewolfBot(commands.Bot):
     def __init__(self):
         intents = discord.Intents.default()
@@ -18,9 +62,118 @@ class WerewolfBot(commands.Bot):
         intents.members = True
         super().__init__(command_prefix="/", intents=intents)
         self.games: Dict[int, GameState] = {}
+        # テキスト・ボイス両方のチャンネルIDからゲームを引く索引
+        self.channel_index: Dict[int, GameState] = {}
+        self.category_locks: Dict[int, asyncio.Lock] = {}
+        self.game_tasks: Dict[int, asyncio.Task] = {}
+        self.actors: Dict[int, GameActor] = {}
+        self.activity_trackers: Dict[int, ActivityTracker] = {}
+        self.voice = VoiceManager()
+        self.matchmaker = Matchmaker()
+        self.prefetcher = PhasePrefetcher()
+        self.presets = PresetStore()
+        self._matchmaking_task: Optional[asyncio.Task] = None
+        self.lifecycle = LifecycleManager(self)
+        self.watchdog = LoopWatchdog(self)
+        self.handoff = HandoffManager(self)
+        self.accepting_games = True
+        self._resume_task: Optional[asyncio.Task] = None
+        self._handoff_task: Optional[asyncio.Task] = None
 
     async def setup_hook(self):
         await self.tree.sync()
+        self.lifecycle.start()
+        self.watchdog.start()
+        self._resume_task = asyncio.create_task(self.handoff.resume())
+        self._matchmaking_task = asyncio.create_task(matchmaking_loop())
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self._start_handoff)
+        except NotImplementedError:
+            pass
+
+    def _start_handoff(self):
+        """SIGTERMを受けたら引き継ぎを開始 (タスクが回収されないよう参照を保持する)"""
+        if self._handoff_task is None or self._handoff_task.done():
+            self._handoff_task = asyncio.create_task(self.handoff.hand_off())
+
+    async def close(self):
+        if self._matchmaking_task:
+            self._matchmaking_task.cancel()
+        self.lifecycle.stop()
+        self.watchdog.stop()
+        await super().close()
+
+    def register_game(self, game_state: GameState):
+        """ゲームを登録"""
+        self.games[game_state.channel_id] = game_state
+        for channel_id in (game_state.text_channel_id, game_state.voice_channel_id):
+            if channel_id is not None:
+                self.channel_index[channel_id] = game_state
+
+    def game_for_channel(self, channel_id: int) -> Optional[GameState]:
+        """テキストまたはボイスチャンネルのIDからゲームを取得"""
+        return self.channel_index.get(channel_id)
+
+    def rekey_game(self, game_state: GameState, old_channel_id: int):
+        """チャンネルの付け替え後にゲームの登録キーを更新"""
+        for registry in (self.games, self.actors, self.game_tasks, self.activity_trackers):
+            if old_channel_id in registry:
+                registry[game_state.channel_id] = registry.pop(old_channel_id)
+        if self.channel_index.get(old_channel_id) is game_state:
+            del self.channel_index[old_channel_id]
+        self.channel_index[game_state.text_channel_id] = game_state
+
+    def unregister_game(self, game_state: GameState, cancel_task: bool = True):
+        """ゲームの登録を解除し、ゲームループを停止"""
+        self.games.pop(game_state.channel_id, None)
+        for channel_id in (game_state.text_channel_id, game_state.voice_channel_id):
+            if self.channel_index.get(channel_id) is game_state:
+                del self.channel_index[channel_id]
+        self.activity_trackers.pop(game_state.channel_id, None)
+        self.prefetcher.discard(game_state)
+        actor = self.actors.pop(game_state.channel_id, None)
+        if actor:
+            actor.stop()
+        task = self.game_tasks.pop(game_state.channel_id, None)
+        if task and cancel_task and task is not asyncio.current_task():
+            task.cancel()
+
+    def start_game_loop(self, game_state: GameState, channel: discord.TextChannel, resume: bool = False):
+        """ゲームループを開始"""
+        self.game_tasks[game_state.channel_id] = asyncio.create_task(
+            game_loop(game_state, channel, resume),
+            name=f"game_loop-{game_state.channel_id}"
+        )
+
+    def build_settings_view(self, game_state: GameState) -> discord.ui.View:
+        """募集中ゲームの設定ビューを作成"""
+        return GameSettingsView(game_state)
+
+    def build_target_view(
+        self,
+        game_state: GameState,
+        guild: discord.Guild,
+        player_id: int,
+        timeout: Optional[float] = 60
+    ) -> discord.ui.View:
+        """投票(player_id=0)、議論スキップまたは夜のアクション用のビューを作成"""
+        if player_id == SKIP_DAY_VIEW_ID:
+            return SkipDayView(game_state, timeout=timeout)
+        if player_id == 0:
+            return VoteView(game_state, guild, timeout=timeout)
+        return NightActionView(game_state, player_id, guild, timeout=timeout)
+
+    def get_actor(self, game_state: GameState) -> Optional[GameActor]:
+        """ゲームの状態変更を直列化するアクターを取得。登録解除済みのゲームならNone"""
+        if self.games.get(game_state.channel_id) is not game_state:
+            return None
+        actor = self.actors.get(game_state.channel_id)
+        if actor is None:
+            actor = GameActor(game_state)
+            self.actors[game_state.channel_id] = actor
+        return actor
+
+bot = WerewolfBot()
 
 class GameSettingsView(discord.ui.View):
     def __init__(self, game_state: GameState):
@@ -38,28 +191,22 @@ class GameSettingsView(discord.ui.View):
 
     @discord.ui.button(label="参加", style=discord.ButtonStyle.green)
     async def join_game(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not self.game_state.can_player_join(interaction.user.id):
-            await interaction.response.send_message(
-                "このゲームに参加できません。以下の理由が考えられます：\n"
-                "- 参加が禁止されている\n"
-                "- 参加可能なユーザーリストに含まれていない\n"
-                "- ゲームの参加人数が上限に達している",
-                ephemeral=True
-            )
+        actor = bot.get_actor(self.game_state)
+        if actor is None:
+            await interaction.response.send_message(GAME_ENDED_MESSAGE, ephemeral=True)
+            return
+        error = await actor.call(self.game_state.add_player, interaction.user.id)
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
             return
 
-        if interaction.user.id not in self.game_state.players:
-            self.game_state.players[interaction.user.id] = PlayerState(
-                member_id=interaction.user.id
-            )
-            await interaction.response.send_message("ゲームに参加しました！", ephemeral=True)
-            
-            # 参加者数の更新を表示
-            await interaction.channel.send(
-                f"現在の参加者数: {len(self.game_state.players)}/{self.game_state.max_players}"
-            )
-        else:
-            await interaction.response.send_message("すでにゲームに参加しています。", ephemeral=True)
+        bot.matchmaker.dequeue(interaction.guild.id, interaction.user.id)
+        await interaction.response.send_message("ゲームに参加しました！", ephemeral=True)
+        
+        # 参加者数の更新を表示
+        await interaction.channel.send(
+            f"現在の参加者数: {len(self.game_state.players)}/{self.game_state.max_players}"
+        )
 
 class PlayerCountModal(discord.ui.Modal):
     def __init__(self, game_state: GameState):
@@ -68,152 +215,275 @@ class PlayerCountModal(discord.ui.Modal):
         
         self.max_players = discord.ui.TextInput(
             label="最大参加人数",
-            placeholder="4-20の間で入力してください",
+            placeholder=f"{MIN_PLAYERS_LIMIT}-{MAX_PLAYERS_LIMIT}の間で入力してください",
             default=str(game_state.max_players),
             min_length=1,
-            max_length=2
+            max_length=3
         )
         self.add_item(self.max_players)
 
     async def on_submit(self, interaction: discord.Interaction):
         try:
             max_players = int(self.max_players.value)
-            if 4 <= max_players <= 20:
-                self.game_state.max_players = max_players
-                await interaction.response.send_message(
-                    f"最大参加人数を{max_players}人に設定しました。",
-                    ephemeral=True
-                )
-            else:
-                await interaction.response.send_message(
-                    "参加人数は4-20の間で設定してください。",
-                    ephemeral=True
-                )
         except ValueError:
             await interaction.response.send_message(
                 "正しい数値を入力してください。",
                 ephemeral=True
             )
+            return
 
-class VoteView(discord.ui.View):
-    def __init__(self, game_state: GameState):
-        super().__init__(timeout=60)
+        actor = bot.get_actor(self.game_state)
+        if actor is None:
+            await interaction.response.send_message(GAME_ENDED_MESSAGE, ephemeral=True)
+            return
+        error = await actor.call(self.game_state.set_max_players, max_players, MAX_PLAYERS_LIMIT)
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
+            return
+        await interaction.response.send_message(
+            f"最大参加人数を{max_players}人に設定しました。",
+            ephemeral=True
+        )
+
+class TargetSelectView(discord.ui.View, metaclass=abc.ABCMeta):
+    """対象プレイヤーを選択する共通ビュー
+
+    少人数ではボタン、多人数ではページ付きのセレクトメニューで表示する。
+    """
+
+    def __init__(
+        self,
+        game_state: GameState,
+        targets: List[int],
+        prefix: str,
+        guild: Optional[discord.Guild] = None,
+        page: int = 0,
+        personal: bool = False,
+        timeout: Optional[float] = 60
+    ):
+        super().__init__(timeout=timeout)
         self.game_state = game_state
-        self.add_vote_buttons()
+        self.targets = targets
+        self.prefix = prefix
+        self.guild = guild
+        self.page = min(max(page, 0), self.page_count - 1)
+        # 個人宛て(DM)のビューはページ送りでメッセージ自体を書き換える
+        self.personal = personal
+        self.render()
+        track_view(self, game_state)
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-len(self.targets) // SELECT_TARGETS_PER_PAGE))
+
+    def render(self):
+        self.clear_items()
+        if len(self.targets) <= BUTTON_MODE_LIMIT:
+            self.add_target_buttons()
+        else:
+            self.add_target_selects()
 
-    def add_vote_buttons(self):
-        alive_players = self.game_state.get_alive_players()
-        for i, player_id in enumerate(alive_players):
+    def add_target_buttons(self):
+        for i, target_id in enumerate(self.targets):
             button = discord.ui.Button(
                 label=f"{i+1}",
-                custom_id=f"vote_{player_id}",
+                custom_id=f"{self.prefix}_{target_id}",
                 style=discord.ButtonStyle.primary
             )
-            button.callback = self.vote_callback
+            button.callback = self.button_callback
             self.add_item(button)
 
-    async def vote_callback(self, interaction: discord.Interaction):
-        if not interaction.user.id in self.game_state.players:
-            await interaction.response.send_message("ゲームに参加していません。", ephemeral=True)
-            return
+    def add_target_selects(self):
+        start = self.page * SELECT_TARGETS_PER_PAGE
+        page_targets = self.targets[start:start + SELECT_TARGETS_PER_PAGE]
+        for row, offset in enumerate(range(0, len(page_targets), SELECT_OPTIONS_LIMIT)):
+            chunk = page_targets[offset:offset + SELECT_OPTIONS_LIMIT]
+            first = start + offset + 1
+            select = discord.ui.Select(
+                placeholder=f"{first}〜{first + len(chunk) - 1}番から選択",
+                custom_id=f"{self.prefix}_select_{self.page}_{row}",
+                options=[
+                    discord.SelectOption(
+                        label=self.target_label(first + i, target_id),
+                        value=str(target_id)
+                    )
+                    for i, target_id in enumerate(chunk)
+                ],
+                row=row
+            )
+            select.callback = self.select_callback
+            self.add_item(select)
 
-        if not self.game_state.players[interaction.user.id].is_alive:
-            await interaction.response.send_message("死亡したプレイヤーは投票できません。", ephemeral=True)
+        if self.page_count > 1:
+            for label, delta in (("◀ 前へ", -1), ("次へ ▶", 1)):
+                button = discord.ui.Button(
+                    label=label,
+                    custom_id=f"{self.prefix}_page_{delta}",
+                    style=discord.ButtonStyle.secondary,
+                    disabled=not 0 <= self.page + delta < self.page_count,
+                    row=4
+                )
+                button.callback = self.page_callback
+                self.add_item(button)
+
+    def target_label(self, number: int, target_id: int) -> str:
+        member = self.guild.get_member(target_id) if self.guild else None
+        name = member.display_name if member else str(target_id)
+        return f"{number}. {name}"[:100]
+
+    async def button_callback(self, interaction: discord.Interaction):
+        target_id = int(interaction.data["custom_id"].rsplit("_", 1)[1])
+        await self.on_target(interaction, target_id)
+
+    async def select_callback(self, interaction: discord.Interaction):
+        target_id = int(interaction.data["values"][0])
+        if target_id not in self.targets:
+            await interaction.response.send_message("このプレイヤーは選択できません。", ephemeral=True)
             return
+        await self.on_target(interaction, target_id)
 
-        if self.game_state.players[interaction.user.id].vote_cast:
-            await interaction.response.send_message("すでに投票済みです。", ephemeral=True)
+    async def page_callback(self, interaction: discord.Interaction):
+        delta = int(interaction.data["custom_id"].rsplit("_", 1)[1])
+        page = min(max(self.page + delta, 0), self.page_count - 1)
+        if self.personal:
+            self.page = page
+            self.render()
+            await interaction.response.edit_message(view=self)
             return
+        # 共有メッセージは書き換えず、押した本人にだけ別ページを表示する
+        view = self.copy_for_page(page)
+        await interaction.response.send_message(
+            f"{page + 1}/{view.page_count}ページ",
+            view=view,
+            ephemeral=True
+        )
 
-        target_id = int(interaction.custom_id.split("_")[1])
-        self.game_state.votes[interaction.user.id] = target_id
-        self.game_state.players[interaction.user.id].vote_cast = True
+    @abc.abstractmethod
+    def copy_for_page(self, page: int) -> "TargetSelectView":
+        """指定ページを表示する同じ種類のビューを作成"""
+
+    @abc.abstractmethod
+    async def on_target(self, interaction: discord.Interaction, target_id: int):
+        """対象が選ばれたときの処理"""
+
+class VoteView(TargetSelectView):
+    def __init__(
+        self,
+        game_state: GameState,
+        guild: Optional[discord.Guild] = None,
+        page: int = 0,
+        timeout: Optional[float] = 60
+    ):
+        super().__init__(
+            game_state,
+            game_state.get_alive_players(),
+            "vote",
+            guild=guild,
+            page=page,
+            timeout=timeout
+        )
+
+    def copy_for_page(self, page: int) -> "VoteView":
+        return VoteView(self.game_state, self.guild, page)
+
+    async def on_target(self, interaction: discord.Interaction, target_id: int):
+        actor = bot.get_actor(self.game_state)
+        if actor is None:
+            await interaction.response.send_message(GAME_ENDED_MESSAGE, ephemeral=True)
+            return
+        error = await actor.call(self.game_state.cast_vote, interaction.user.id, target_id)
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
+            return
         
         await interaction.response.send_message(f"<@{target_id}> に投票しました。", ephemeral=True)
 
-class NightActionView(discord.ui.View):
-    def __init__(self, game_state: GameState, player_id: int):
-        super().__init__(timeout=60)
-        self.game_state = game_state
+class NightActionView(TargetSelectView):
+    def __init__(
+        self,
+        game_state: GameState,
+        player_id: int,
+        guild: Optional[discord.Guild] = None,
+        page: int = 0,
+        timeout: Optional[float] = 60
+    ):
         self.player_id = player_id
-        self.add_action_buttons()
-
-    def add_action_buttons(self):
-        alive_players = [
-            pid for pid in self.game_state.get_alive_players()
-            if pid != self.player_id
-        ]
-        for i, target_id in enumerate(alive_players):
-            button = discord.ui.Button(
-                label=f"{i+1}",
-                custom_id=f"action_{target_id}",
-                style=discord.ButtonStyle.primary
-            )
-            button.callback = self.action_callback
-            self.add_item(button)
+        super().__init__(
+            game_state,
+            [pid for pid in game_state.get_alive_players() if pid != player_id],
+            "action",
+            guild=guild,
+            page=page,
+            personal=True,
+            timeout=timeout
+        )
 
-    async def action_callback(self, interaction: discord.Interaction):
+    def copy_for_page(self, page: int) -> "NightActionView":
+        return NightActionView(self.game_state, self.player_id, self.guild, page)
+
+    async def on_target(self, interaction: discord.Interaction, target_id: int):
         if interaction.user.id != self.player_id:
             await interaction.response.send_message("このアクションは実行できません。", ephemeral=True)
             return
 
-        if self.game_state.players[self.player_id].action_performed:
-            await interaction.response.send_message("すでにアクションを実行済みです。", ephemeral=True)
+        actor = bot.get_actor(self.game_state)
+        if actor is None:
+            await interaction.response.send_message(GAME_ENDED_MESSAGE, ephemeral=True)
             return
-
-        target_id = int(interaction.custom_id.split("_")[1])
-        player = self.game_state.players[self.player_id]
-        
-        # 狩人の場合、同じ対象を連続で守れない
-        if (player.role == Role.GUARD and 
-            player.last_action_target == target_id and 
-            player.last_action_day == self.game_state.day - 1):
-            await interaction.response.send_message(
-                "同じ対象を連続で守ることはできません。",
-                ephemeral=True
-            )
+        error = await actor.call(self.game_state.submit_night_action, self.player_id, target_id)
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
             return
-
-        self.game_state.night_actions Continuing the bot.py file content exactly where it left off:
-
-        self.game_state.night_actions[self.player_id] = target_id
-        self.game_state.players[self.player_id].action_performed = True
         
         await interaction.response.send_message(f"アクションを実行しました。", ephemeral=True)
 
+class SkipDayView(discord.ui.View):
+    def __init__(self, game_state: GameState, timeout: Optional[float] = None):
+        super().__init__(timeout=timeout)
+        self.game_state = game_state
+        track_view(self, game_state)
+
+    @discord.ui.button(label="投票へ進む", style=discord.ButtonStyle.secondary, custom_id="skip_day")
+    async def skip(self, interaction: discord.Interaction, button: discord.ui.Button):
+        actor = bot.get_actor(self.game_state)
+        if actor is None:
+            await interaction.response.send_message(GAME_ENDED_MESSAGE, ephemeral=True)
+            return
+        error = await actor.call(self.game_state.request_skip, interaction.user.id)
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
+            return
+        await interaction.response.send_message(
+            f"スキップに賛成しました。({len(self.game_state.skip_votes)}/{len(self.game_state.get_alive_players())})",
+            ephemeral=True
+        )
+
 @bot.event
 async def on_ready():
     print(f"{bot.user} としてログインしました")
 
+@bot.event
+async def on_message(message: discord.Message):
+    tracker = bot.activity_trackers.get(message.channel.id)
+    if tracker is not None and not message.author.bot:
+        tracker.record()
+    await bot.process_commands(message)
+
 @bot.tree.command(name="werewolf", description="人狼ゲームを作成します")
 async def create_werewolf(interaction: discord.Interaction):
-    # カテゴリーの作成/取得
-    category = discord.utils.get(interaction.guild.categories, name="Werewolf")
-    if not category:
-        category = await interaction.guild.create_category("Werewolf")
+    if not bot.accepting_games:
+        await interaction.response.send_message(
+            "メンテナンス中のため、新しいゲームは作成できません。しばらくしてからお試しください。",
+            ephemeral=True
+        )
+        return
 
     # チャンネル名の設定
     channel_name = f"{interaction.user.name}の人狼"
-    
-    # テキストチャンネルの作成
-    text_channel = await interaction.guild.create_text_channel(
-        channel_name,
-        category=category
-    )
-    
-    # ボイスチャンネルの作成
-    voice_channel = await interaction.guild.create_voice_channel(
-        channel_name,
-        category=category
+    game_state, text_channel = await create_game_channels(
+        interaction.guild, interaction.user.id, channel_name
     )
     
-    # ゲームインスタンスの作成
-    game_state = GameState(interaction.user.id, text_channel.id)
-    game_state.text_channel_id = text_channel.id
-    game_state.voice_channel_id = voice_channel.id
-    game_state.game_name = channel_name
-    bot.games[text_channel.id] = game_state
-    
     # 設定用の埋め込みメッセージを作成
     embed = MessageManager.create_game_settings_embed()
     view = GameSettingsView(game_state)
@@ -224,9 +494,64 @@ async def create_werewolf(interaction: discord.Interaction):
         ephemeral=True
     )
 
+async def get_game_category(guild: discord.Guild, slots: int) -> discord.CategoryChannel:
+    """空きのある人狼カテゴリーを取得し、すべて埋まっていれば新しく作成"""
+    numbers = []
+    for category in guild.categories:
+        number = game_category_number(category.name)
+        if number is None:
+            continue
+        if len(category.channels) + slots <= CATEGORY_CHANNEL_LIMIT:
+            return category
+        numbers.append(number)
+    name = CATEGORY_NAME if not numbers else f"{CATEGORY_NAME} {max(numbers) + 1}"
+    return await guild.create_category(name)
+
+def game_category_number(name: str) -> Optional[int]:
+    """「Werewolf」は1、「Werewolf N」はNを返す。人狼カテゴリーでなければNone"""
+    if name == CATEGORY_NAME:
+        return 1
+    prefix = f"{CATEGORY_NAME} "
+    if name.startswith(prefix) and name[len(prefix):].isdigit():
+        return int(name[len(prefix):])
+    return None
+
+async def create_game_channels(
+    guild: discord.Guild,
+    creator_id: int,
+    channel_name: str
+) -> Tuple[GameState, discord.TextChannel]:
+    """ゲーム用のテキスト・ボイスチャンネルを作成してゲームを登録"""
+    # 同時に作成してもカテゴリーの上限を超えないよう、サーバー単位で直列化する
+    lock = bot.category_locks.setdefault(guild.id, asyncio.Lock())
+    async with lock:
+        category = await get_game_category(guild, slots=GAME_CHANNEL_SLOTS)
+        
+        # テキストチャンネルの作成
+        text_channel = await guild.create_text_channel(
+            channel_name,
+            category=category
+        )
+        
+        # ボイスチャンネルの作成
+        voice_channel = await guild.create_voice_channel(
+            channel_name,
+            category=category
+        )
+    
+    # ゲームインスタンスの作成
+    game_state = GameState(creator_id, text_channel.id)
+    game_state.text_channel_id = text_channel.id
+    game_state.voice_channel_id = voice_channel.id
+    game_state.guild_id = guild.id
+    game_state.game_name = channel_name
+    game_state.role_preset = bot.presets.get(guild.id)
+    bot.register_game(game_state)
+    return game_state, text_channel
+
 @bot.tree.command(name="start", description="人狼ゲームを開始します")
 async def start_game(interaction: discord.Interaction):
-    game_state = bot.games.get(interaction.channel.id)
+    game_state = bot.game_for_channel(interaction.channel.id)
     if not game_state:
         await interaction.response.send_message(
             "このチャンネルでゲームは作成されていません。",
@@ -254,52 +579,136 @@ async def start_game(interaction: discord.Interaction):
 
     await start_game_process(interaction, game_state)
 
-async def start_game_process(interaction: discord.Interaction, game_state: GameState):
-    if not game_state.calculate_roles():
-        await interaction.response.send_message(
-            "プレイヤーが足りません（最低4人必要です）。",
-            ephemeral=True
-        )
+async def start_game_process(
+    interaction: Optional[discord.Interaction],
+    game_state: GameState,
+    channel: Optional[discord.TextChannel] = None
+):
+    """ゲームを開始する。マッチメイキングからはinteractionなしでchannelを渡す"""
+    started = time.perf_counter()
+    channel = channel or interaction.channel
+
+    # 引き継ぎの書き出し後に開始したゲームは失われるため、停止中は開始しない
+    if not bot.accepting_games:
+        if interaction:
+            await interaction.response.send_message(
+                "メンテナンス中のため、ゲームを開始できません。しばらくしてからお試しください。",
+                ephemeral=True
+            )
         return
 
     # ゲーム開始処理
-    game_state.phase = GamePhase.NIGHT
-    game_state.started_at = datetime.now()
-    channel = interaction.channel
-    
-    # 役職の通知
-    for player_id in game_state.players:
-        member = interaction.guild.get_member(player_id)
-        if member:
-            embed = MessageManager.create_role_embed(player_id, game_state)
-            try:
-                await member.send(embed=embed)
-            except discord.Forbidden:
-                await channel.send(
-                    f"{member.mention} にDMを送信できませんでした。",
-                    ephemeral=True
-                )
+    actor = bot.get_actor(game_state)
+    if actor is None:
+        if interaction:
+            await interaction.response.send_message(GAME_ENDED_MESSAGE, ephemeral=True)
+        return
+    error = await actor.call(game_state.start)
+    if error:
+        if interaction:
+            await interaction.response.send_message(error, ephemeral=True)
+        return
+
+    try:
+        channel = await setup_started_game(interaction, game_state, channel, started)
+    except Exception:
+        # ここで止まるとゲームループのないゲームが残るため、終了扱いにして回収する
+        logger.exception("ゲームの開始処理に失敗しました: %s", game_state.channel_id)
+        await bot.lifecycle.abort_game(game_state, "ゲームの開始処理に失敗しました。")
+        return
+
+    # ゲームループの開始
+    bot.start_game_loop(game_state, channel)
+
+async def setup_started_game(
+    interaction: Optional[discord.Interaction],
+    game_state: GameState,
+    channel: discord.TextChannel,
+    started: float
+) -> discord.TextChannel:
+    """開始したゲームのチャンネルを初期化して役職を通知し、以降に使うチャンネルを返す"""
+    guild = channel.guild
+    if interaction:
+        await interaction.response.send_message("ゲームを開始します。", ephemeral=True)
+    start_trace(game_state)
 
-    # チャンネルの設定変更
-    await channel.purge()
-    
     # 参加者のみがアクセスできるように権限を設定
     overwrites = {
-        interaction.guild.default_role: discord.PermissionOverwrite(read_messages=False),
-        interaction.guild.me: discord.PermissionOverwrite(read_messages=True)
+        guild.default_role: discord.PermissionOverwrite(read_messages=False),
+        guild.me: discord.PermissionOverwrite(read_messages=True)
     }
     for player_id in game_state.players:
-        member = interaction.guild.get_member(player_id)
+        member = guild.get_member(player_id)
         if member:
             overwrites[member] = discord.PermissionOverwrite(read_messages=True)
+
+    # チャンネルの設定変更
+    with span(game_state, "reset_channel", "api"):
+        if interaction:
+            channel, method = await reset_game_channel(game_state, channel, overwrites)
+        else:
+            # 自動で作ったチャンネルは空なので権限の変更だけでよい
+            await channel.edit(overwrites=overwrites)
+            method = "fresh"
+    reset_elapsed = time.perf_counter() - started
     
-    await channel.edit(overwrites=overwrites)
+    # 役職の通知
+    for player_id in game_state.players:
+        member = guild.get_member(player_id)
+        if member:
+            embed = MessageManager.create_role_embed(player_id, game_state)
+            try:
+                with span(game_state, "dm_role", "api", player=player_id):
+                    await member.send(embed=embed)
+            except discord.Forbidden:
+                await channel.send(f"{member.mention} にDMを送信できませんでした。")
     
     # ゲーム開始メッセージ
     await channel.send("ゲームを開始します！各プレイヤーにDMで役職が通知されました。")
-    
-    # ゲームループの開始
-    asyncio.create_task(game_loop(game_state, channel))
+    logger.info(
+        "ゲーム開始 channel=%s players=%d 所要時間=%.2fs (チャンネル初期化 %.2fs, 方式=%s)",
+        channel.id, len(game_state.players), time.perf_counter() - started, reset_elapsed, method
+    )
+    return channel
+
+async def reset_game_channel(
+    game_state: GameState,
+    channel: discord.TextChannel,
+    overwrites: Dict
+) -> Tuple[discord.TextChannel, str]:
+    """ロビーチャンネルを参加者用の権限で作り直し、古いチャンネルは裏で削除する"""
+    guild = channel.guild
+    lock = bot.category_locks.setdefault(guild.id, asyncio.Lock())
+    try:
+        async with lock:
+            # 作成時に枠を確保しているが、手動で追加されたチャンネルで埋まっていれば別のカテゴリーに置く
+            category = channel.category
+            if category is None or len(category.channels) >= CATEGORY_CHANNEL_LIMIT:
+                category = await get_game_category(guild, slots=1)
+            new_channel = await guild.create_text_channel(
+                channel.name,
+                category=category,
+                position=channel.position,
+                topic=channel.topic,
+                overwrites=overwrites,
+                reason="人狼ゲーム開始"
+            )
+    except discord.HTTPException:
+        # 作り直せない場合はメッセージの一括削除で代替する
+        logger.warning("チャンネルを作り直せませんでした。一括削除で初期化します: %s", channel.id)
+        await channel.edit(overwrites=overwrites)
+        await channel.purge(limit=CHANNEL_PURGE_LIMIT)
+        return channel, "purge"
+
+    actor = bot.get_actor(game_state)
+    if actor is None:
+        # 作り直しの間にゲームが終了した
+        await new_channel.delete()
+        return channel, "recreate"
+    await actor.call(game_state.move_text_channel, new_channel.id)
+    bot.rekey_game(game_state, channel.id)
+    bot.lifecycle.delete_channel_later(channel.id)
+    return new_channel, "recreate"
 
 class StartGameConfirmView(discord.ui.View):
     def __init__(self, game_state: GameState):
@@ -320,54 +729,104 @@ class StartGameConfirmView(discord.ui.View):
             return
         await interaction.response.send_message("募集を続けます。", ephemeral=True)
 
-async def game_loop(game_state: GameState, channel: discord.TextChannel):
+async def send_embeds(
+    channel: discord.abc.Messageable,
+    embeds: List[discord.Embed],
+    view: Optional[discord.ui.View] = None
+) -> discord.Message:
+    """埋め込みを制限内のメッセージに分けて送信し、ビューは最後のメッセージに付ける"""
+    batches = EmbedBuilder.pack_messages(embeds)
+    message = None
+    for i, batch in enumerate(batches):
+        if i == len(batches) - 1 and view is not None:
+            message = await channel.send(embeds=batch, view=view)
+        else:
+            message = await channel.send(embeds=batch)
+    return message
+
+async def wait_for_phase_end(game_state: GameState):
+    """フェーズ終了予定時刻まで待機"""
+    if game_state.phase_end_time is None:
+        return
+    remaining = (game_state.phase_end_time - datetime.now()).total_seconds()
+    if remaining > 0:
+        await asyncio.sleep(remaining)
+
+async def game_loop(game_state: GameState, channel: discord.TextChannel, resume: bool = False):
+    try:
+        with span(game_state, "game_loop", resume=resume):
+            await run_game_loop(game_state, channel, resume)
+    except Exception:
+        logger.exception("ゲームループが異常終了しました: %s", game_state.channel_id)
+        await bot.lifecycle.abort_game(game_state)
+    finally:
+        # 引き継ぎ中は次のプロセスがフェーズを再適用するのでミュートを残す
+        if not bot.handoff.in_progress:
+            await bot.voice.release(game_state, channel.guild)
+        await finish_trace(game_state)
+
+async def run_game_loop(game_state: GameState, channel: discord.TextChannel, resume: bool):
+    actor = bot.get_actor(game_state)
+    if actor is None:
+        return
     while True:
         # ゲーム終了チェック
         is_over, winner = game_state.is_game_over()
         if is_over:
-            embed = MessageManager.create_game_result_embed(game_state, winner)
-            await channel.send(embed=embed)
+            embeds = MessageManager.create_game_result_embeds(game_state, winner)
+            await send_embeds(channel, embeds)
+            await channel.send(
+                f"このチャンネルは{int(bot.lifecycle.channel_grace.total_seconds() // 60)}分後に削除されます。"
+            )
+            await bot.lifecycle.finish_game(game_state, winner)
             break
 
-        if game_state.phase == GamePhase.NIGHT:
-            # 夜フェーズの処理
-            await handle_night_phase(game_state, channel)
-            game_state.phase = GamePhase.DAY
-            
-        elif game_state.phase == GamePhase.DAY:
-            # 昼フェーズの処理
-            await handle_day_phase(game_state, channel)
-            game_state.phase = GamePhase.VOTE
-            
-        elif game_state.phase == GamePhase.VOTE:
-            # 投票フェーズの処理
-            await handle_vote_phase(game_state, channel)
-            game_state.phase = GamePhase.NIGHT
-            game_state.day += 1
-
-async def handle_night_phase(game_state: GameState, channel: discord.TextChannel):
-    await channel.send(f"=== {game_state.day}日目の夜 ===")
-    
-    # 夜のアクションを処理
-    for player_id, player in game_state.players.items():
-        if not player.is_alive:
-            continue
-            
-        if player.role in [Role.WEREWOLF, Role.SEER, Role.GUARD]:
-            member = channel.guild.get_member(player_id)
-            if member:
-                embed = MessageManager.create_night_action_embed(player_id, game_state)
-                view = NightActionView(game_state, player_id)
-                try:
-                    await member.send(embed=embed, view=view)
-                except discord.Forbidden:
-                    continue
+        with span(game_state, f"{game_state.phase.value}_phase", day=game_state.day):
+            with span(game_state, "voice_update", "api"):
+                await bot.voice.apply_phase(game_state, channel.guild)
+
+            if game_state.phase == GamePhase.NIGHT:
+                # 夜フェーズの処理
+                await handle_night_phase(game_state, channel, resume)
+                
+            elif game_state.phase == GamePhase.DAY:
+                # 昼フェーズの処理
+                await handle_day_phase(game_state, channel, resume)
+                
+            elif game_state.phase == GamePhase.VOTE:
+                # 投票フェーズの処理
+                await handle_vote_phase(game_state, channel, resume)
+
+        resume = False
+        await actor.call(game_state.advance_phase)
+
+async def handle_night_phase(game_state: GameState, channel: discord.TextChannel, resume: bool = False):
+    game_actor = bot.get_actor(game_state)
+    if game_actor is None:
+        return
+    if not resume:
+        await channel.send(f"=== {game_state.day}日目の夜 ===")
+        await game_actor.call(game_state.begin_phase, timedelta(seconds=60))
+
+        # 夜のアクションを処理 (投票結果の処理中に用意したものがあればそれを使う)
+        prompts = await bot.prefetcher.take(game_state, "night_prompts")
+        if prompts is None:
+            prompts = build_night_prompts(game_state, channel.guild)
+        await asyncio.gather(*(
+            send_night_prompt(game_state, channel.guild, player_id, embeds, view)
+            for player_id, embeds, view in prompts
+        ))
 
     # アクション待機時間
-    await asyncio.sleep(60)  # 1分待機
+    with span(game_state, "wait_players", "wait"):
+        await wait_for_phase_end(game_state)
     
     # 夜のアクションの結果を処理
-    killed_player, messages = game_state.handle_night_actions()
+    with span(game_state, "handle_night_actions", "resolve"):
+        killed_player, messages = await game_actor.call(game_state.handle_night_actions)
+
+    # 結果の通知中に昼のステータスを用意しておく
+    bot.prefetcher.prefetch(game_state, "day_status", lambda: build_day_status(game_state))
     
     # 結果を通知
     if killed_player:
@@ -376,60 +835,136 @@ async def handle_night_phase(game_state: GameState, channel: discord.TextChannel
             await channel.send(f"{member.mention} が殺害されました。")
 
     # 各プレイヤーへの結果通知
-    for msg_type, actor_id, target_id, role in messages:
-        actor = channel.guild.get_member(actor_id)
-        if not actor:
+    for result in messages:
+        message = render_night_result(result)
+        actor = channel.guild.get_member(result.actor_id)
+        if message is None or not actor:
+            continue
+        try:
+            with span(game_state, f"dm_{result.kind}_result", "api", player=result.actor_id):
+                await actor.send(embed=MessageManager.create_night_result_embed(message))
+        except discord.Forbidden:
             continue
 
-        if msg_type == "seer":
-            target = channel.guild.get_member(target_id)
-            if target and role:
-                embed = discord.Embed(
-                    title="占い結果",
-                    description=f"{target.mention} の役職は {role.value} でした。",
-                    color=discord.Color.gold()
-                )
-                try:
-                    await actor.send(embed=embed)
-                except discord.Forbidden:
-                    continue
-
-        elif msg_type == "medium":
-            target = channel.guild.get_member(target_id)
-            if target and role:
-                embed = discord.Embed(
-                    title="霊媒結果",
-                    description=f"処刑された {target.mention} の役職は {role.value} でした。",
-                    color=discord.Color.purple()
-                )
-                try:
-                    await actor.send(embed=embed)
-                except discord.Forbidden:
-                    continue
+def build_night_prompts(
+    game_state: GameState,
+    guild: discord.Guild
+) -> List[Tuple[int, List[discord.Embed], "NightActionView"]]:
+    """夜のアクションを行うプレイヤーへのDMの内容を作成"""
+    prompts = []
+    for player_id in game_state.get_alive_players():
+        handler = get_night_handler(game_state.players[player_id].role)
+        if handler is not None and handler.needs_target:
+            embeds = MessageManager.create_night_action_embeds(player_id, game_state)
+            prompts.append((player_id, embeds, NightActionView(game_state, player_id, guild)))
+    return prompts
 
-async def handle_day_phase(game_state: GameState, channel: discord.TextChannel):
-    await channel.send(f"=== {game_state.day}日目の昼 ===")
-    
-    # ステータス表示
-    embed = MessageManager.create_game_status_embed(game_state)
-    await channel.send(embed=embed)
+async def send_night_prompt(
+    game_state: GameState,
+    guild: discord.Guild,
+    player_id: int,
+    embeds: List[discord.Embed],
+    view: "NightActionView"
+):
+    """夜のアクションのDMを送信"""
+    member = guild.get_member(player_id)
+    if not member:
+        return
+    try:
+        with span(game_state, "dm_night_action", "api", player=player_id):
+            message = await send_embeds(member, embeds, view)
+    except discord.Forbidden:
+        return
+    actor = bot.get_actor(game_state)
+    if actor is not None:
+        await actor.call(game_state.add_view_message, message.id, player_id)
+
+def build_day_status(game_state: GameState) -> Tuple[List[discord.Embed], "SkipDayView"]:
+    """昼のステータス表示を作成"""
+    embeds = MessageManager.create_game_status_embeds(game_state, GamePhase.DAY)
+    return embeds, SkipDayView(game_state, timeout=game_state.vote_time_minutes * 60)
+
+def build_vote_prompt(
+    game_state: GameState,
+    guild: discord.Guild
+) -> Tuple[List[discord.Embed], "VoteView"]:
+    """投票の表示を作成"""
+    return MessageManager.create_voting_embeds(game_state), VoteView(game_state, guild)
+
+async def handle_day_phase(game_state: GameState, channel: discord.TextChannel, resume: bool = False):
+    actor = bot.get_actor(game_state)
+    if actor is None:
+        return
+    view = None
+    if not resume:
+        await channel.send(f"=== {game_state.day}日目の昼 ===")
+        await actor.call(game_state.begin_phase, timedelta(minutes=game_state.vote_time_minutes))
+        
+        # ステータス表示 (夜の結果の通知中に用意したものがあればそれを使う)
+        payload = await bot.prefetcher.take(game_state, "day_status")
+        embeds, view = payload or build_day_status(game_state)
+        with span(game_state, "send_status", "api"):
+            message = await send_embeds(channel, embeds, view)
+        await actor.call(game_state.add_view_message, message.id, SKIP_DAY_VIEW_ID)
+
+    # 議論中に投票の表示を用意しておく
+    bot.prefetcher.prefetch(game_state, "vote", lambda: build_vote_prompt(game_state, channel.guild))
     
     # 議論時間
-    await asyncio.sleep(game_state.vote_time_minutes * 60)
+    tracker = bot.activity_trackers.setdefault(game_state.channel_id, ActivityTracker())
+    try:
+        with span(game_state, "discussion", "wait"):
+            reason = await wait_for_day_end(game_state, tracker)
+    finally:
+        bot.activity_trackers.pop(game_state.channel_id, None)
+        # 議論が早く終わってもスキップボタンを残さない
+        if view is not None:
+            view.stop()
 
-async def handle_vote_phase(game_state: GameState, channel: discord.TextChannel):
-    await channel.send("=== 投票時間 ===")
-    
-    # 投票の実行
-    embed = MessageManager.create_voting_embed(game_state)
-    view = VoteView(game_state)
-    await channel.send(embed=embed, view=view)
+    if reason == "skip":
+        await channel.send("過半数がスキップに賛成したため、投票に移ります。")
+    elif reason == "quiet":
+        await channel.send("発言が少なくなったため、投票に移ります。")
+
+async def wait_for_day_end(game_state: GameState, tracker: ActivityTracker) -> str:
+    """議論の終了まで待機し、終了理由を返す"""
+    while True:
+        if game_state.skip_majority_reached():
+            return "skip"
+        if tracker.is_quiet(DAY_QUIET_MESSAGES_PER_MINUTE):
+            return "quiet"
+        if game_state.phase_end_time is None:
+            return "timeout"
+        remaining = (game_state.phase_end_time - datetime.now()).total_seconds()
+        if remaining <= 0:
+            return "timeout"
+        await asyncio.sleep(min(DAY_POLL_SECONDS, remaining))
+
+async def handle_vote_phase(game_state: GameState, channel: discord.TextChannel, resume: bool = False):
+    actor = bot.get_actor(game_state)
+    if actor is None:
+        return
+    if not resume:
+        await channel.send("=== 投票時間 ===")
+        await actor.call(game_state.begin_phase, timedelta(seconds=60))
+
+        # 投票の実行 (議論中に用意したものがあればそれを使う)
+        payload = await bot.prefetcher.take(game_state, "vote")
+        embeds, view = payload or build_vote_prompt(game_state, channel.guild)
+        with span(game_state, "send_vote", "api"):
+            message = await send_embeds(channel, embeds, view)
+        await actor.call(game_state.add_view_message, message.id, 0)
     
     # 投票待機時間
-    await asyncio.sleep(60)  # 1分待機
+    with span(game_state, "wait_votes", "wait"):
+        await wait_for_phase_end(game_state)
     
     # 投票結果の処理
-    eliminated_player = game_state.handle_voting()
+    with span(game_state, "handle_voting", "resolve"):
+        eliminated_player = await actor.call(game_state.handle_voting)
+
+    # 結果の通知中に夜のアクションのDMを用意しておく
+    bot.prefetcher.prefetch(game_state, "night_prompts", lambda: build_night_prompts(game_state, channel.guild))
     if eliminated_player:
         member = channel.guild.get_member(eliminated_player)
         if member:
@@ -440,7 +975,7 @@ async def handle_vote_phase(game_state: GameState, channel: discord.TextChannel)
 
 @bot.tree.command(name="end", description="人狼ゲームを終了します")
 async def end_game(interaction: discord.Interaction):
-    game_state = bot.games.get(interaction.channel.id)
+    game_state = bot.game_for_channel(interaction.channel.id)
     if not game_state:
         await interaction.response.send_message(
             "このチャンネルでゲームは作成されていません。",
@@ -455,20 +990,20 @@ async def end_game(interaction: discord.Interaction):
         )
         return
     
-    # チャンネルの削除
-    category = interaction.channel.category
-    for channel in category.channels:
-        if channel.name == game_state.game_name:
-            await channel.delete()
-    
     # ゲームの削除
-    del bot.games[interaction.channel.id]
+    bot.unregister_game(game_state)
     
     await interaction.response.send_message("ゲームを終了しました。", ephemeral=True)
 
+    # チャンネルの削除
+    for channel_id in (game_state.text_channel_id, game_state.voice_channel_id):
+        channel = interaction.guild.get_channel(channel_id) if channel_id else None
+        if channel:
+            await channel.delete()
+
 @bot.tree.command(name="kick", description="プレイヤーをゲームからキックします")
 async def kick_player(interaction: discord.Interaction, player: discord.Member):
-    game_state = bot.games.get(interaction.channel.id)
+    game_state = bot.game_for_channel(interaction.channel.id)
     if not game_state:
         await interaction.response.send_message(
             "このチャンネルでゲームは作成されていません。",
@@ -491,17 +1026,199 @@ async def kick_player(interaction: discord.Interaction, player: discord.Member):
         return
     
     # プレイヤーの削除
-    del game_state.players[player.id]
-    game_state.banned_players.add(player.id)
+    actor = bot.get_actor(game_state)
+    if actor is None:
+        await interaction.response.send_message(GAME_ENDED_MESSAGE, ephemeral=True)
+        return
+    await actor.call(game_state.kick_player, player.id)
     
     # チャンネルの権限を更新
-    overwrites = interaction.channel.overwrites
-    del overwrites[player]
-    await interaction.channel.edit(overwrites=overwrites)
+    text_channel = interaction.guild.get_channel(game_state.text_channel_id)
+    if text_channel:
+        overwrites = text_channel.overwrites
+        if overwrites.pop(player, None) is not None:
+            await text_channel.edit(overwrites=overwrites)
     
     await interaction.response.send_message(
         f"{player.mention} をゲームからキックしました。",
         ephemeral=True
     )
 
-bot.run(os.getenv('DIS
\ No newline at end of file
+@bot.tree.command(name="queue", description="マッチメイキングの待機列に参加/離脱します")
+async def queue_command(interaction: discord.Interaction):
+    guild_id = interaction.guild.id
+    if bot.matchmaker.dequeue(guild_id, interaction.user.id):
+        await interaction.response.send_message("待機列から離脱しました。", ephemeral=True)
+        return
+
+    if not bot.accepting_games:
+        await interaction.response.send_message(
+            "メンテナンス中のため、待機列に参加できません。",
+            ephemeral=True
+        )
+        return
+
+    if any(
+        interaction.user.id in game.players and game.phase != GamePhase.FINISHED
+        for game in bot.games.values()
+    ):
+        await interaction.response.send_message("すでにゲームに参加しています。", ephemeral=True)
+        return
+
+    bot.matchmaker.enqueue(guild_id, interaction.user.id)
+    await interaction.response.send_message(
+        f"待機列に参加しました。（{bot.matchmaker.size(guild_id)}/{bot.matchmaker.target_size}人）\n"
+        "もう一度 /queue を実行すると離脱します。",
+        ephemeral=True
+    )
+    await run_matchmaking(interaction.guild)
+
+async def run_matchmaking(guild: discord.Guild):
+    """待機列の参加者を募集中のロビーに入れ、残りで新しいゲームを組む"""
+    matchmaker = bot.matchmaker
+
+    # 人数が足りず止まっているロビーを、開始まであと少しのものから埋める
+    lobbies = sorted(
+        (game for game in bot.games.values()
+         if game.guild_id == guild.id and game.open_slots() > 0
+         and len(game.players) < game.min_players),
+        key=lambda game: game.min_players - len(game.players)
+    )
+    for game_state in lobbies:
+        if not matchmaker.size(guild.id):
+            break
+        # 並べ替えた後に手動参加で埋まっていることがある
+        need = game_state.min_players - len(game_state.players)
+        if need <= 0:
+            continue
+        actor = bot.get_actor(game_state)
+        if actor is None:
+            continue
+        joined = []
+        failed = []
+        # キックされたなどでこのロビーに入れない人は列に残して次のロビーに回す
+        entries = matchmaker.take_entries(
+            guild.id, min(need, game_state.open_slots()), game_state.can_player_join
+        )
+        for member_id, queued_at in entries:
+            error = await actor.call(game_state.add_player, member_id)
+            if error is None:
+                joined.append(member_id)
+            else:
+                failed.append((member_id, queued_at))
+        matchmaker.requeue(guild.id, failed)
+        channel = guild.get_channel(game_state.text_channel_id)
+        if joined and channel:
+            await channel.send(
+                "待機列から参加しました: " + " ".join(f"<@{pid}>" for pid in joined) +
+                f"\n現在の参加者数: {len(game_state.players)}/{game_state.max_players}"
+            )
+
+    # 待機列だけで新しいゲームを組んで自動で開始する
+    while bot.accepting_games:
+        members = matchmaker.take_match(guild.id)
+        if not members:
+            break
+        game_state, channel = await create_game_channels(
+            guild, members[0], f"マッチ{channel_suffix()}の人狼"
+        )
+        actor = bot.get_actor(game_state)
+        await actor.call(
+            game_state.set_max_players, max(game_state.max_players, len(members)), MAX_PLAYERS_LIMIT
+        )
+        for member_id in members:
+            await actor.call(game_state.add_player, member_id)
+        await channel.send(
+            "マッチングが成立しました！ " + " ".join(f"<@{pid}>" for pid in members)
+        )
+        await start_game_process(None, game_state, channel)
+
+@bot.tree.command(name="wwdebug", description="ゲームごとのメモリとタスクの状況を表示します（管理者用）")
+@app_commands.default_permissions(administrator=True)
+@app_commands.describe(allocations="tracemallocの上位割り当て箇所も表示する")
+async def wwdebug(interaction: discord.Interaction, allocations: bool = False):
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("このコマンドは管理者のみ実行できます。", ephemeral=True)
+        return
+
+    await interaction.response.defer(ephemeral=True)
+    reports = await collect_game_diagnostics(bot, interaction.guild.id)
+    builder = EmbedBuilder(
+        title="人狼ボット診断",
+        description=(
+            f"ゲーム数: {len(reports)} / 全体: {len(bot.games)}\n"
+            f"ループ遅延: 直近 {bot.watchdog.last_lag * 1000:.0f}ms / 最大 {bot.watchdog.max_lag * 1000:.0f}ms\n"
+            f"先読み: 使用 {bot.prefetcher.hits} / 作り直し {bot.prefetcher.misses}"
+        ),
+        color=discord.Color.dark_grey()
+    )
+    builder.add_lines("🎲 ゲーム", [
+        f"<#{r.channel_id}> {r.phase} {r.day}日目 {r.players}人 | "
+        f"約{r.memory_bytes / 1024:.1f}KiB | ビュー{r.pending_views} タスク{r.live_tasks} "
+        f"待機{r.queue_depth} | ログ{r.log_lines}行 | フェーズ経過{r.phase_age_seconds:.0f}秒"
+        for r in reports
+    ])
+    if allocations:
+        top = await top_allocations()
+        builder.add_lines(
+            "🧠 tracemalloc 上位",
+            top if top is not None else ["計測を開始しました。もう一度実行すると結果を表示して計測を終了します。"]
+        )
+    for batch in EmbedBuilder.pack_messages(builder.build()):
+        await interaction.followup.send(embeds=batch, ephemeral=True)
+
+@bot.tree.command(name="rolepreset", description="このサーバーの役職構成を表示・変更します（管理者用）")
+@app_commands.default_permissions(administrator=True)
+@app_commands.describe(preset="新しく作成するゲームで使う役職構成")
+@app_commands.choices(preset=[
+    app_commands.Choice(name=preset.label, value=preset.name)
+    for preset in ROLE_PRESETS.values()
+])
+async def role_preset(interaction: discord.Interaction, preset: Optional[str] = None):
+    if preset is not None:
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("役職構成の変更は管理者のみ実行できます。", ephemeral=True)
+            return
+        bot.presets.set(interaction.guild.id, preset)
+
+    table = get_role_table(bot.presets.get(interaction.guild.id))
+    rows = []
+    for total_players in range(MIN_PLAYERS_LIMIT, MAX_PLAYERS_LIMIT + 1):
+        counts: Dict[Role, int] = {}
+        for role in table.roles_for(total_players):
+            counts[role] = counts.get(role, 0) + 1
+        rows.append(f"{total_players}人: " + " ".join(f"{role.value}{count}" for role, count in counts.items()))
+
+    builder = EmbedBuilder(
+        title=f"役職構成: {table.preset.label}",
+        description="変更しました。新しく作成するゲームから適用されます。" if preset else None,
+        color=discord.Color.blurple()
+    )
+    builder.add_lines("👥 人数ごとの役職", rows)
+    batches = EmbedBuilder.pack_messages(builder.build())
+    await interaction.response.send_message(embeds=batches[0], ephemeral=True)
+    for batch in batches[1:]:
+        await interaction.followup.send(embeds=batch, ephemeral=True)
+
+def channel_suffix() -> str:
+    return datetime.now().strftime("%H%M%S")
+
+async def matchmaking_loop():
+    """待ち時間で成立するマッチを拾うために定期的に待機列を確認"""
+    await bot.wait_until_ready()
+    while True:
+        await asyncio.sleep(15)
+        for guild_id in list(bot.matchmaker.queues):
+            guild = bot.get_guild(guild_id)
+            if guild is None:
+                bot.matchmaker.queues.pop(guild_id, None)
+                continue
+            try:
+                await run_matchmaking(guild)
+            except Exception:
+                logger.exception("マッチメイキングに失敗しました: %s", guild_id)
+
+# ボット全体のINFOログ(開始までの遅延や高速化の状態など)も出力するため、ルートロガーに設定する
+discord.utils.setup_logging(root=True)
+speedups.install()
+bot.run(os.getenv('DISCORD_TOKEN'), log_handler=None)
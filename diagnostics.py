@@ -0,0 +1,111 @@
+import asyncio
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+
+from loop_watchdog import pending_view_count
+
+# 1回の集計でサイズ計測に辿るオブジェクト数の上限(全ゲーム合計)
+SIZE_SCAN_BUDGET = 50000
+
+
+@dataclass
+class GameDiagnostics:
+    """1ゲーム分の診断情報"""
+    channel_id: int
+    guild_id: Optional[int]
+    game_name: str
+    phase: str
+    day: int
+    players: int
+    memory_bytes: int
+    pending_views: int
+    live_tasks: int
+    queue_depth: int
+    log_lines: int
+    phase_age_seconds: float
+
+
+def approx_size(obj, limit: int = SIZE_SCAN_BUDGET) -> int:
+    """コンテナやインスタンス属性を辿っておおよそのメモリ使用量を求める"""
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack and len(seen) < limit:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, (type, Enum)):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif hasattr(current, "__dict__"):
+            stack.append(vars(current))
+    return total
+
+
+async def collect_game_diagnostics(bot, guild_id: Optional[int] = None) -> List[GameDiagnostics]:
+    """bot.gamesの各ゲームの診断情報を集計する。guild_idで絞り込み可能
+
+    サイズ計測はイベントループ上で行うため、辿るオブジェクト数を全ゲームで
+    SIZE_SCAN_BUDGETに抑え、ゲームごとに他のタスクへ順番を譲る。
+    """
+    now = datetime.now()
+    reports = []
+    games = [
+        (channel_id, game_state) for channel_id, game_state in list(bot.games.items())
+        if guild_id is None or game_state.guild_id == guild_id
+    ]
+    scan_limit = SIZE_SCAN_BUDGET // max(len(games), 1)
+    for channel_id, game_state in games:
+        await asyncio.sleep(0)
+        task = bot.game_tasks.get(channel_id)
+        actor = bot.actors.get(channel_id)
+        live_tasks = int(task is not None and not task.done())
+        if actor is not None and actor.is_running:
+            live_tasks += 1
+        reports.append(GameDiagnostics(
+            channel_id=channel_id,
+            guild_id=game_state.guild_id,
+            game_name=game_state.game_name,
+            phase=game_state.phase.value,
+            day=game_state.day,
+            players=len(game_state.players),
+            memory_bytes=approx_size(game_state, scan_limit),
+            pending_views=pending_view_count(channel_id),
+            live_tasks=live_tasks,
+            queue_depth=actor.queue_depth if actor else 0,
+            log_lines=len(game_state.action_logs),
+            phase_age_seconds=(now - game_state.phase_started_at).total_seconds(),
+        ))
+    return reports
+
+
+def _top_allocations(limit: int) -> List[str]:
+    snapshot = tracemalloc.take_snapshot()
+    # 計測はオーバーヘッドが大きいため、結果を取ったら止める
+    tracemalloc.stop()
+    stats = snapshot.statistics("lineno")[:limit]
+    return [
+        f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} "
+        f"{stat.size / 1024:.1f} KiB ({stat.count}件)"
+        for stat in stats
+    ]
+
+
+async def top_allocations(limit: int = 10) -> Optional[List[str]]:
+    """tracemallocの上位割り当て箇所を別スレッドで集計する
+
+    計測が未開始の場合は開始してNoneを返す。次の呼び出しでそれまでの
+    割り当てを集計し、計測を終了する。
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        return None
+    return await asyncio.to_thread(_top_allocations, limit)
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+
+from game_manager import GameState
+
+logger = logging.getLogger(__name__)
+
+
+class GameActor:
+    """1つのゲームの状態変更を受信箱経由で直列に処理するアクター
+
+    ボタン操作やコマンド、ゲームループからの変更はすべてcallで受信箱に積まれ、
+    単一のコンシューマーが順番にGameStateへ適用する。ロックは使わない。
+    登録前(作成直後やfrom_dictでの復元中)と登録解除後のGameStateは
+    他から参照されないため、アクターを通さずに変更してよい。
+    """
+
+    def __init__(self, game_state: GameState):
+        self.game_state = game_state
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        self.processed = 0
+        self.max_depth = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def queue_depth(self) -> int:
+        """未処理のコマンド数"""
+        return self.inbox.qsize()
+
+    @property
+    def is_running(self) -> bool:
+        """コンシューマーが動作中か"""
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """コンシューマーを開始"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._consume())
+
+    def stop(self):
+        """コンシューマーを停止し、未処理のコマンドを取り消す"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        while not self.inbox.empty():
+            _, _, future = self.inbox.get_nowait()
+            if not future.done():
+                future.cancel()
+
+    async def call(self, func: Callable[..., Any], *args) -> Any:
+        """コマンドを受信箱に積み、適用結果を待つ"""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self.inbox.put_nowait((func, args, future))
+        self.max_depth = max(self.max_depth, self.inbox.qsize())
+        return await future
+
+    async def _consume(self):
+        while True:
+            func, args, future = await self.inbox.get()
+            self._apply(func, args, future)
+            # 連打時は溜まっているコマンドをまとめて処理する
+            while not self.inbox.empty():
+                self._apply(*self.inbox.get_nowait())
+
+    def _apply(self, func: Callable[..., Any], args: tuple, future: asyncio.Future):
+        if future.cancelled():
+            return
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            logger.exception("ゲームコマンドの処理に失敗しました: %s", getattr(func, "__name__", func))
+            future.set_exception(e)
+        finally:
+            self.processed += 1
@@ -1,8 +1,9 @@
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Dict, List, Set, Optional, Tuple
+from typing import Dict, Iterable, List, NamedTuple, Set, Optional, Tuple
 import random
+import secrets
 
 class GamePhase(Enum):
     WAITING = "waiting"
@@ -36,6 +37,7 @@ class GameState:
         self.channel_id = channel_id
         self.text_channel_id: Optional[int] = None
         self.voice_channel_id: Optional[int] = None
+        self.guild_id: Optional[int] = None
         self.phase = GamePhase.WAITING
         self.players: Dict[int, PlayerState] = {}
         self.max_players = 20
@@ -48,52 +50,86 @@ class GameState:
         self.day = 1
         self.votes: Dict[int, int] = {}
         self.night_actions: Dict[int, int] = {}
+        self.skip_votes: Set[int] = set()
         self.action_logs: List[str] = []
+        self.role_members: Dict[Role, List[int]] = {}
         self.last_eliminated: Optional[int] = None
         self.last_killed: Optional[int] = None
         self.recruitment_end_time: Optional[datetime] = None
         self.started_at: Optional[datetime] = None
         self.phase_end_time: Optional[datetime] = None
+        self.created_at = datetime.now()
+        self.phase_started_at = self.created_at
+        self.finished_at: Optional[datetime] = None
+        self.last_activity_at = self.created_at
+        self.winner: Optional[str] = None
+        # 役職の割り当てに使ったプリセットとシード (同じ値で割り当てを再現できる)
+        self.role_preset = DEFAULT_ROLE_PRESET
+        self.role_seed: Optional[int] = None
+        # 開始時の参加者と役職 (開始後にキックされたプレイヤーも含む)
+        self.initial_roles: Dict[int, Role] = {}
+        # ビュー付きメッセージID -> 対象プレイヤーID (投票メッセージは0、議論スキップはSKIP_DAY_VIEW_ID)
+        self.view_messages: Dict[int, int] = {}
 
     def calculate_roles(self) -> bool:
         """役職を計算して割り当てる"""
         if len(self.players) < self.min_players:
             return False
 
-        player_ids = list(self.players.keys())
-        random.shuffle(player_ids)
-        
-        # プレイヤー数に応じた役職の割り当て
-        total_players = len(player_ids)
-        role_counts = self._calculate_role_distribution(total_players)
-
-        # 役職の割り当て
-        current_index = 0
-        for role, count in role_counts.items():
-            for _ in range(count):
-                if current_index < len(player_ids):
-                    player_id = player_ids[current_index]
-                    self.players[player_id].role = role
-                    current_index += 1
-
-        # 残りのプレイヤーを村人に
-        while current_index < len(player_ids):
-            player_id = player_ids[current_index]
-            self.players[player_id].role = Role.VILLAGER
-            current_index += 1
+        if self.role_seed is None:
+            self.role_seed = new_role_seed()
 
+        # 事前計算した役職表とゲームごとのシードで割り当てる
+        assignment = get_role_table(self.role_preset).assign(self.players, self.role_seed)
+        for player_id, role in assignment.items():
+            self.players[player_id].role = role
+        self.initial_roles = assignment
+
+        self._rebuild_role_index()
         return True
 
-    def _calculate_role_distribution(self, total_players: int) -> Dict[Role, int]:
-        """プレイヤー数に応じた役職の分布を計算"""
-        role_counts = {
-            Role.WEREWOLF: max(1, total_players // 4),
-            Role.SEER: 1,
-            Role.GUARD: 1 if total_players >= 6 else 0,
-            Role.MEDIUM: 1 if total_players >= 8 else 0,
-            Role.ACCOMPLICE: 1 if total_players >= 10 else 0
-        }
-        return role_counts
+    def start(self) -> Optional[str]:
+        """役職を割り当ててゲームを開始する。開始できない場合は理由を返す"""
+        if self.phase != GamePhase.WAITING:
+            return "ゲームはすでに開始されています。"
+        if not self.calculate_roles():
+            return f"プレイヤーが足りません（最低{self.min_players}人必要です）。"
+        self.phase = GamePhase.NIGHT
+        self.started_at = datetime.now()
+        self.phase_started_at = self.started_at
+        return None
+
+    def begin_phase(self, duration: timedelta):
+        """フェーズの受付を開始する。前のフェーズの入力とビューの記録を消して締め切りを設定"""
+        if self.phase == GamePhase.NIGHT:
+            self.reset_night_actions()
+        elif self.phase == GamePhase.VOTE:
+            self.reset_votes()
+        self.view_messages.clear()
+        self.phase_end_time = datetime.now() + duration
+
+    def add_view_message(self, message_id: int, target_id: int):
+        """ビュー付きメッセージを記録 (引き継ぎ時の再接続用)"""
+        self.view_messages[message_id] = target_id
+
+    def advance_phase(self):
+        """次のフェーズに進める"""
+        if self.phase == GamePhase.NIGHT:
+            self.phase = GamePhase.DAY
+        elif self.phase == GamePhase.DAY:
+            self.phase = GamePhase.VOTE
+            self.skip_votes.clear()
+        elif self.phase == GamePhase.VOTE:
+            self.phase = GamePhase.NIGHT
+            self.day += 1
+        self.phase_started_at = datetime.now()
+
+    def _rebuild_role_index(self):
+        """役職ごとのプレイヤー索引を再構築"""
+        self.role_members = {}
+        for player_id, player in self.players.items():
+            if player.role is not None:
+                self.role_members.setdefault(player.role, []).append(player_id)
 
     def get_alive_players(self) -> List[int]:
         """生存しているプレイヤーのIDリストを取得"""
@@ -101,8 +137,8 @@ class GameState:
 
     def get_players_by_role(self, role: Role) -> List[int]:
         """指定された役職の生存プレイヤーのIDリストを取得"""
-        return [pid for pid, state in self.players.items() 
-                if state.role == role and state.is_alive]
+        return [pid for pid in self.role_members.get(role, ())
+                if pid in self.players and self.players[pid].is_alive]
 
     def is_game_over(self) -> Tuple[bool, Optional[str]]:
         """ゲーム終了条件をチェック"""
@@ -122,59 +158,31 @@ class GameState:
         timestamp = datetime.now().strftime("%H:%M:%S")
         self.action_logs.append(f"[{timestamp}] {message}")
 
-    def handle_night_actions(self) -> Tuple[Optional[int], List[Tuple[str, int, Optional[int], Optional[Role]]]]:
-        """夜のアクションを処理"""
-        messages = []
-        killed_player = None
-        
-        # 占い師のアクション
-        for seer_id in self.get_players_by_role(Role.SEER):
-            if seer_id in self.night_actions:
-                target_id = self.night_actions[seer_id]
-                target_role = self.players[target_id].role
-                messages.append(("seer", seer_id, target_id, target_role))
-                self.players[seer_id].last_action_target = target_id
-                self.players[seer_id].last_action_day = self.day
-
-        # 狩人のアクション
-        for guard_id in self.get_players_by_role(Role.GUARD):
-            if guard_id in self.night_actions:
-                target_id = self.night_actions[guard_id]
-                # 同じ対象を連続で守れない
-                if self.players[guard_id].last_action_target != target_id:
-                    self.players[target_id].is_protected = True
-                    self.players[guard_id].last_action_target = target_id
-                    self.players[guard_id].last_action_day = self.day
-                    messages.append(("guard", guard_id, target_id, None))
-
-        # 人狼のアクション
-        werewolf_votes = {}
-        for werewolf_id in self.get_players_by_role(Role.WEREWOLF):
-            if werewolf_id in self.night_actions:
-                target_id = self.night_actions[werewolf_id]
-                werewolf_votes[target_id] = werewolf_votes.get(target_id, 0) + 1
-
-        if werewolf_votes:
-            target_id = max(werewolf_votes.items(), key=lambda x: x[1])[0]
-            if not self.players[target_id].is_protected:
-                self.players[target_id].is_alive = False
-                killed_player = target_id
-                self.last_killed = target_id
-                messages.append(("kill", target_id, None, None))
-            else:
-                messages.append(("protected", target_id, None, None))
-
-        # 霊媒師のアクション
-        if self.last_eliminated:
-            for medium_id in self.get_players_by_role(Role.MEDIUM):
-                eliminated_role = self.players[self.last_eliminated].role
-                messages.append(("medium", medium_id, self.last_eliminated, eliminated_role))
+    def handle_night_actions(self) -> Tuple[Optional[int], List["NightResult"]]:
+        """夜のアクションを優先度順に一括処理"""
+        context = NightContext(self)
+
+        # アクションを役職ハンドラーごとに振り分け
+        actions_by_role: Dict[Role, List[Tuple[int, int]]] = {}
+        for actor_id, target_id in self.night_actions.items():
+            actor = self.players.get(actor_id)
+            if actor is None or not actor.is_alive or target_id not in self.players:
+                continue
+            if actor.role in _NIGHT_HANDLERS:
+                actions_by_role.setdefault(actor.role, []).append((actor_id, target_id))
+
+        for handler in _ORDERED_NIGHT_HANDLERS:
+            for actor_id, target_id in actions_by_role.get(handler.role, ()):
+                handler.act(context, actor_id, target_id)
+            handler.resolve(context)
 
         # 保護状態をリセット
-        for player in self.players.values():
-            player.is_protected = False
+        for player_id in context.protected:
+            self.players[player_id].is_protected = False
 
-        return killed_player, messages
+        # 処理済みのアクションは再解決されないよう破棄する
+        self.night_actions.clear()
+        return context.killed, context.results
 
     def handle_voting(self) -> Optional[int]:
         """投票を処理して結果を返す"""
@@ -184,6 +192,8 @@ class GameState:
         vote_counts = {}
         for target_id in self.votes.values():
             vote_counts[target_id] = vote_counts.get(target_id, 0) + 1
+        # 集計済みの投票は再集計されないよう破棄する
+        self.votes.clear()
 
         # 最多得票者を特定
         max_votes = max(vote_counts.values())
@@ -210,6 +220,114 @@ class GameState:
         for player in self.players.values():
             player.action_performed = False
 
+    def add_player(self, player_id: int) -> Optional[str]:
+        """プレイヤーを参加させる。参加できない場合は理由を返す"""
+        if player_id in self.players:
+            return "すでにゲームに参加しています。"
+        if self.phase != GamePhase.WAITING or not self.can_player_join(player_id):
+            return (
+                "このゲームに参加できません。以下の理由が考えられます：\n"
+                "- 参加が禁止されている\n"
+                "- 参加可能なユーザーリストに含まれていない\n"
+                "- ゲームの参加人数が上限に達している"
+            )
+        self.players[player_id] = PlayerState(member_id=player_id)
+        self.touch()
+        return None
+
+    def kick_player(self, player_id: int) -> bool:
+        """プレイヤーをゲームから除外し、関連する投票とアクションも取り消す"""
+        if player_id not in self.players:
+            return False
+        del self.players[player_id]
+        self.banned_players.add(player_id)
+        self.votes.pop(player_id, None)
+        self.night_actions.pop(player_id, None)
+        self.skip_votes.discard(player_id)
+        # 除外したプレイヤーを処刑・殺害の記録から外す
+        if self.last_eliminated == player_id:
+            self.last_eliminated = None
+        if self.last_killed == player_id:
+            self.last_killed = None
+        for voter_id in [v for v, t in self.votes.items() if t == player_id]:
+            del self.votes[voter_id]
+            self.players[voter_id].vote_cast = False
+        for actor_id in [a for a, t in self.night_actions.items() if t == player_id]:
+            del self.night_actions[actor_id]
+            self.players[actor_id].action_performed = False
+        return True
+
+    def cast_vote(self, voter_id: int, target_id: int) -> Optional[str]:
+        """投票を記録する。投票できない場合は理由を返す"""
+        voter = self.players.get(voter_id)
+        if voter is None:
+            return "ゲームに参加していません。"
+        if not voter.is_alive:
+            return "死亡したプレイヤーは投票できません。"
+        if self.phase != GamePhase.VOTE:
+            return "現在は投票時間ではありません。"
+        if voter.vote_cast:
+            return "すでに投票済みです。"
+        target = self.players.get(target_id)
+        if target is None or not target.is_alive:
+            return "このプレイヤーには投票できません。"
+        self.votes[voter_id] = target_id
+        voter.vote_cast = True
+        return None
+
+    def submit_night_action(self, actor_id: int, target_id: int) -> Optional[str]:
+        """夜のアクションを記録する。実行できない場合は理由を返す"""
+        actor = self.players.get(actor_id)
+        if actor is None or not actor.is_alive or self.phase != GamePhase.NIGHT:
+            return "このアクションは実行できません。"
+        if actor.action_performed:
+            return "すでにアクションを実行済みです。"
+        handler = _NIGHT_HANDLERS.get(actor.role)
+        if handler is None or not handler.needs_target:
+            return "このアクションは実行できません。"
+        target = self.players.get(target_id)
+        if target is None or not target.is_alive:
+            return "このプレイヤーは選択できません。"
+        error = handler.validate_target(self, actor, target_id)
+        if error:
+            return error
+        self.night_actions[actor_id] = target_id
+        actor.action_performed = True
+        return None
+
+    def request_skip(self, player_id: int) -> Optional[str]:
+        """議論スキップに賛成する。賛成できない場合は理由を返す"""
+        player = self.players.get(player_id)
+        if player is None or not player.is_alive:
+            return "生存しているプレイヤーのみがスキップに賛成できます。"
+        if self.phase != GamePhase.DAY:
+            return "現在は議論時間ではありません。"
+        if player_id in self.skip_votes:
+            return "すでにスキップに賛成しています。"
+        self.skip_votes.add(player_id)
+        return None
+
+    def skip_majority_reached(self) -> bool:
+        """生存者の過半数が議論スキップに賛成しているかチェック"""
+        alive = sum(1 for pid in self.skip_votes if pid in self.players and self.players[pid].is_alive)
+        return alive * 2 > len(self.get_alive_players())
+
+    def set_max_players(self, max_players: int, limit: int) -> Optional[str]:
+        """最大参加人数を変更する。変更できない場合は理由を返す"""
+        if not self.min_players <= max_players <= limit:
+            return f"参加人数は{self.min_players}-{limit}の間で設定してください。"
+        if self.phase != GamePhase.WAITING:
+            return "ゲーム開始後は参加人数を変更できません。"
+        self.max_players = max_players
+        self.touch()
+        return None
+
+    def open_slots(self) -> int:
+        """誰でも参加できる募集中ロビーの空き人数"""
+        if self.phase != GamePhase.WAITING or self.allowed_players:
+            return 0
+        return max(0, self.max_players - len(self.players))
+
     def can_player_join(self, player_id: int) -> bool:
         """プレイヤーが参加可能かチェック"""
         if player_id in self.banned_players:
@@ -225,4 +343,477 @@ class GameState:
         return (
             len(self.players) >= self.min_players and
             len(self.players) <= self.max_players
-        )
\ No newline at end of file
+        )
+
+    def move_text_channel(self, channel_id: int):
+        """テキストチャンネルの付け替えを反映"""
+        self.channel_id = channel_id
+        self.text_channel_id = channel_id
+
+    def touch(self):
+        """最終アクティビティ時刻を更新"""
+        self.last_activity_at = datetime.now()
+
+    def finish(self, winner: Optional[str]):
+        """ゲームを終了状態にする"""
+        self.phase = GamePhase.FINISHED
+        self.winner = winner
+        self.finished_at = datetime.now()
+        self.phase_started_at = self.finished_at
+        self.phase_end_time = None
+
+    def is_idle_lobby(self, now: datetime, timeout: timedelta) -> bool:
+        """放置された募集中ロビーかチェック"""
+        return (
+            self.phase == GamePhase.WAITING and
+            now - self.last_activity_at >= timeout
+        )
+
+    def to_dict(self) -> dict:
+        """引き継ぎ用にゲーム状態全体を辞書に変換"""
+        return {
+            "creator_id": self.creator_id,
+            "channel_id": self.channel_id,
+            "text_channel_id": self.text_channel_id,
+            "voice_channel_id": self.voice_channel_id,
+            "guild_id": self.guild_id,
+            "phase": self.phase.value,
+            "players": [
+                {**asdict(p), "role": p.role.name if p.role else None}
+                for p in self.players.values()
+            ],
+            "max_players": self.max_players,
+            "min_players": self.min_players,
+            "banned_players": list(self.banned_players),
+            "allowed_players": list(self.allowed_players),
+            "dm_invites": list(self.dm_invites),
+            "vote_time_minutes": self.vote_time_minutes,
+            "game_name": self.game_name,
+            "day": self.day,
+            "votes": list(self.votes.items()),
+            "night_actions": list(self.night_actions.items()),
+            "skip_votes": list(self.skip_votes),
+            "action_logs": self.action_logs,
+            "last_eliminated": self.last_eliminated,
+            "last_killed": self.last_killed,
+            "recruitment_end_time": _dump_datetime(self.recruitment_end_time),
+            "started_at": _dump_datetime(self.started_at),
+            "phase_end_time": _dump_datetime(self.phase_end_time),
+            "created_at": _dump_datetime(self.created_at),
+            "phase_started_at": _dump_datetime(self.phase_started_at),
+            "finished_at": _dump_datetime(self.finished_at),
+            "last_activity_at": _dump_datetime(self.last_activity_at),
+            "winner": self.winner,
+            "role_preset": self.role_preset,
+            "role_seed": self.role_seed,
+            "initial_roles": [[pid, role.name] for pid, role in self.initial_roles.items()],
+            "view_messages": list(self.view_messages.items()),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "GameState":
+        """to_dictで変換した辞書からゲーム状態を復元"""
+        game_state = cls(data["creator_id"], data["channel_id"])
+        game_state.text_channel_id = data["text_channel_id"]
+        game_state.voice_channel_id = data["voice_channel_id"]
+        game_state.guild_id = data["guild_id"]
+        game_state.phase = GamePhase(data["phase"])
+        for player_data in data["players"]:
+            role = player_data["role"]
+            player = PlayerState(**{**player_data, "role": Role[role] if role else None})
+            game_state.players[player.member_id] = player
+        game_state.max_players = data["max_players"]
+        game_state.min_players = data["min_players"]
+        game_state.banned_players = set(data["banned_players"])
+        game_state.allowed_players = set(data["allowed_players"])
+        game_state.dm_invites = set(data["dm_invites"])
+        game_state.vote_time_minutes = data["vote_time_minutes"]
+        game_state.game_name = data["game_name"]
+        game_state.day = data["day"]
+        game_state.votes = dict(data["votes"])
+        game_state.night_actions = dict(data["night_actions"])
+        game_state.skip_votes = set(data["skip_votes"])
+        game_state.action_logs = list(data["action_logs"])
+        game_state.last_eliminated = data["last_eliminated"]
+        game_state.last_killed = data["last_killed"]
+        game_state.recruitment_end_time = _load_datetime(data["recruitment_end_time"])
+        game_state.started_at = _load_datetime(data["started_at"])
+        game_state.phase_end_time = _load_datetime(data["phase_end_time"])
+        game_state.created_at = _load_datetime(data["created_at"])
+        game_state.phase_started_at = _load_datetime(data["phase_started_at"])
+        game_state.finished_at = _load_datetime(data["finished_at"])
+        game_state.last_activity_at = _load_datetime(data["last_activity_at"])
+        game_state.winner = data["winner"]
+        # 旧バージョンからの引き継ぎではプリセットとシードが含まれない
+        game_state.role_preset = data.get("role_preset", DEFAULT_ROLE_PRESET)
+        game_state.role_seed = data.get("role_seed")
+        game_state.initial_roles = {pid: Role[role] for pid, role in data.get("initial_roles", [])}
+        game_state.view_messages = dict(data["view_messages"])
+        game_state._rebuild_role_index()
+        return game_state
+
+    def to_archive(self) -> dict:
+        """アーカイブ用のコンパクトな辞書に変換"""
+        return {
+            "ch": self.channel_id,
+            "creator": self.creator_id,
+            "name": self.game_name,
+            "winner": self.winner,
+            "day": self.day,
+            "created": int(self.created_at.timestamp()),
+            "started": int(self.started_at.timestamp()) if self.started_at else None,
+            "finished": int(self.finished_at.timestamp()) if self.finished_at else None,
+            "preset": self.role_preset,
+            "seed": self.role_seed,
+            # 開始時の[id, 役職] (シードはこの参加者に対して適用される)
+            "roster": [[pid, role.name] for pid, role in self.initial_roles.items()],
+            # [id, 役職, 生存]
+            "players": [
+                [pid, p.role.name if p.role else None, int(p.is_alive)]
+                for pid, p in self.players.items()
+            ],
+            "logs": self.action_logs,
+        }
+
+
+def _dump_datetime(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _load_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+# view_messagesで議論スキップのメッセージを表すID
+SKIP_DAY_VIEW_ID = -1
+
+# 役職表を事前計算する最大人数
+ROLE_TABLE_MAX_PLAYERS = 100
+DEFAULT_ROLE_PRESET = "standard"
+
+
+@dataclass(frozen=True)
+class RolePreset:
+    """役職構成のプリセット"""
+    name: str
+    label: str
+    # 人狼の数 = 人数 // werewolf_divisor (最低1人)
+    werewolf_divisor: int = 4
+    # (役職, その役職が1人入る最低人数)
+    thresholds: Tuple[Tuple[Role, int], ...] = ()
+
+    def distribution(self, total_players: int) -> Dict[Role, int]:
+        """プレイヤー数に応じた役職の分布を計算"""
+        role_counts = {Role.WEREWOLF: max(1, total_players // self.werewolf_divisor)}
+        for role, min_players in self.thresholds:
+            role_counts[role] = 1 if total_players >= min_players else 0
+        return role_counts
+
+
+class RoleTable:
+    """プリセットを人数ごとの役職の並びに展開した表"""
+
+    def __init__(self, preset: RolePreset, max_players: int = ROLE_TABLE_MAX_PLAYERS):
+        self.preset = preset
+        self.rows: Tuple[Tuple[Role, ...], ...] = tuple(
+            self._build_row(total_players) for total_players in range(max_players + 1)
+        )
+
+    def _build_row(self, total_players: int) -> Tuple[Role, ...]:
+        roles: List[Role] = []
+        for role, count in self.preset.distribution(total_players).items():
+            roles.extend([role] * count)
+        # 人数を超える分は切り捨て、残りは村人にする
+        roles = roles[:total_players]
+        roles.extend([Role.VILLAGER] * (total_players - len(roles)))
+        return tuple(roles)
+
+    def roles_for(self, total_players: int) -> Tuple[Role, ...]:
+        """人数に対応する役職の並びを取得"""
+        if total_players < len(self.rows):
+            return self.rows[total_players]
+        return self._build_row(total_players)
+
+    def assign(self, player_ids: Iterable[int], seed: int) -> Dict[int, Role]:
+        """シードから役職の割り当てを決定する。同じ参加者とシードなら常に同じ結果"""
+        ordered = sorted(player_ids)
+        roles = list(self.roles_for(len(ordered)))
+        random.Random(seed).shuffle(roles)
+        return dict(zip(ordered, roles))
+
+
+ROLE_PRESETS: Dict[str, RolePreset] = {}
+_ROLE_TABLES: Dict[str, RoleTable] = {}
+
+
+def register_role_preset(preset: RolePreset):
+    """プリセットを登録し、役職表を事前計算する"""
+    ROLE_PRESETS[preset.name] = preset
+    _ROLE_TABLES[preset.name] = RoleTable(preset)
+
+
+def get_role_table(preset_name: str) -> RoleTable:
+    """プリセットの役職表を取得。未登録の場合は標準の表を使う"""
+    return _ROLE_TABLES.get(preset_name) or _ROLE_TABLES[DEFAULT_ROLE_PRESET]
+
+
+def new_role_seed() -> int:
+    """ゲームごとの役職割り当て用シードを生成"""
+    return secrets.randbits(63)
+
+
+def generate_role_assignments(
+    player_ids: Iterable[int],
+    count: int,
+    preset_name: str = DEFAULT_ROLE_PRESET,
+    seeds: Optional[Iterable[int]] = None
+) -> List[Tuple[int, Dict[int, Role]]]:
+    """(シード, 割り当て)をまとめて生成する。seedsを省略すると新しいシードを使う"""
+    table = get_role_table(preset_name)
+    ordered = sorted(player_ids)
+    seeds = list(seeds) if seeds is not None else [new_role_seed() for _ in range(count)]
+    return [(seed, table.assign(ordered, seed)) for seed in seeds[:count]]
+
+
+def verify_role_assignment(
+    assignment: Dict[int, Role],
+    seed: int,
+    preset_name: str = DEFAULT_ROLE_PRESET
+) -> bool:
+    """割り当てがシードとプリセットから再現できるものか検証"""
+    return get_role_table(preset_name).assign(assignment, seed) == assignment
+
+
+def verify_archived_game(record: dict) -> Optional[bool]:
+    """to_archiveの記録の役職を検証する。シードが記録されていない場合はNone
+
+    シードは開始時の参加者に適用されるため、開始時の名簿で再計算し、
+    終了時まで残ったプレイヤーの役職が名簿と一致することも確認する。
+    """
+    if record.get("seed") is None:
+        return None
+    if "roster" in record:
+        assignment = {pid: Role[role] for pid, role in record["roster"]}
+    else:
+        # 名簿を記録する前のアーカイブは終了時の参加者で検証する
+        assignment = {pid: Role[role] for pid, role, _ in record["players"] if role}
+    for pid, role, _ in record["players"]:
+        if role is None or assignment.get(pid) != Role[role]:
+            return False
+    return verify_role_assignment(assignment, record["seed"], record.get("preset", DEFAULT_ROLE_PRESET))
+
+
+register_role_preset(RolePreset(
+    name="standard",
+    label="標準",
+    werewolf_divisor=4,
+    thresholds=((Role.SEER, 0), (Role.GUARD, 6), (Role.MEDIUM, 8), (Role.ACCOMPLICE, 10)),
+))
+register_role_preset(RolePreset(
+    name="beginner",
+    label="初心者向け",
+    werewolf_divisor=5,
+    thresholds=((Role.SEER, 0), (Role.GUARD, 6), (Role.MEDIUM, 10)),
+))
+register_role_preset(RolePreset(
+    name="advanced",
+    label="上級者向け",
+    werewolf_divisor=4,
+    thresholds=((Role.SEER, 0), (Role.GUARD, 5), (Role.MEDIUM, 7), (Role.ACCOMPLICE, 8)),
+))
+
+
+class NightResult(NamedTuple):
+    """夜のアクションの結果レコード"""
+    kind: str
+    actor_id: int
+    target_id: Optional[int] = None
+    role: Optional[Role] = None
+
+
+class NightContext:
+    """夜の解決処理中に役職ハンドラー間で共有される状態"""
+
+    def __init__(self, game_state: GameState):
+        self.game_state = game_state
+        self.protected: Set[int] = set()
+        self.kill_votes: Dict[int, int] = {}
+        self.killed: Optional[int] = None
+        self.results: List[NightResult] = []
+
+
+class NightResultMessage(NamedTuple):
+    """夜の結果として本人に通知する内容"""
+    title: str
+    description: str
+    color: int
+
+
+class NightRoleHandler:
+    """夜の役職アクションのハンドラー基底クラス
+
+    priorityの小さい順に処理され、各ハンドラーは自分の役職のアクションを
+    actで受け取った後、resolveで結果を確定する。夜のDMの有無と文面、
+    結果の通知内容もハンドラーが決めるため、役職の追加はハンドラーの登録だけで済む。
+    """
+    role: Role
+    priority: int = 100
+    # 夜に対象を選ぶDMを送るか
+    needs_target: bool = False
+    prompt_title: str = "アクション選択"
+    prompt_description: str = "行動を選択してください"
+    prompt_notes: Optional[str] = None
+
+    def validate_target(self, game_state: GameState, actor: PlayerState, target_id: int) -> Optional[str]:
+        """対象を選べない場合は理由を返す"""
+        return None
+
+    def act(self, context: NightContext, actor_id: int, target_id: int):
+        pass
+
+    def resolve(self, context: NightContext):
+        pass
+
+    def render_result(self, result: NightResult) -> Optional[NightResultMessage]:
+        """このハンドラーの結果なら本人への通知内容を返す"""
+        return None
+
+
+_NIGHT_HANDLERS: Dict[Role, NightRoleHandler] = {}
+_ORDERED_NIGHT_HANDLERS: List[NightRoleHandler] = []
+
+
+def register_night_handler(handler_cls):
+    """夜の役職ハンドラーを登録するデコレーター"""
+    handler = handler_cls()
+    _NIGHT_HANDLERS[handler.role] = handler
+    _ORDERED_NIGHT_HANDLERS[:] = sorted(_NIGHT_HANDLERS.values(), key=lambda h: h.priority)
+    return handler_cls
+
+
+def get_night_handler(role: Optional[Role]) -> Optional[NightRoleHandler]:
+    """役職の夜のハンドラーを取得"""
+    return _NIGHT_HANDLERS.get(role)
+
+
+def render_night_result(result: NightResult) -> Optional[NightResultMessage]:
+    """夜の結果を本人への通知内容に変換。通知しない結果ならNone"""
+    for handler in _ORDERED_NIGHT_HANDLERS:
+        message = handler.render_result(result)
+        if message is not None:
+            return message
+    return None
+
+
+@register_night_handler
+class SeerHandler(NightRoleHandler):
+    role = Role.SEER
+    priority = 10
+    needs_target = True
+    prompt_title = "🔮 占う対象を選択"
+    prompt_description = "占いをかける対象を選んでください"
+    prompt_notes = (
+        "- 占った対象が人狼かどうかわかります\n"
+        "- 結果はDMで通知されます\n"
+        "- 情報の使い方は慎重に"
+    )
+
+    def act(self, context: NightContext, actor_id: int, target_id: int):
+        game_state = context.game_state
+        target_role = game_state.players[target_id].role
+        context.results.append(NightResult("seer", actor_id, target_id, target_role))
+        seer = game_state.players[actor_id]
+        seer.last_action_target = target_id
+        seer.last_action_day = game_state.day
+
+    def render_result(self, result: NightResult) -> Optional[NightResultMessage]:
+        if result.kind != "seer" or result.role is None:
+            return None
+        return NightResultMessage(
+            "占い結果", f"<@{result.target_id}> の役職は {result.role.value} でした。", 0xF1C40F
+        )
+
+
+@register_night_handler
+class GuardHandler(NightRoleHandler):
+    role = Role.GUARD
+    priority = 20
+    needs_target = True
+    prompt_title = "🛡️ 守る対象を選択"
+    prompt_description = "今夜守る対象を選んでください"
+    prompt_notes = (
+        "- 同じ人を連続で守ることはできません\n"
+        "- 自分自身は守れません\n"
+        "- 守り先は秘密にしましょう"
+    )
+
+    def validate_target(self, game_state: GameState, actor: PlayerState, target_id: int) -> Optional[str]:
+        if actor.last_action_target == target_id and actor.last_action_day == game_state.day - 1:
+            return "同じ対象を連続で守ることはできません。"
+        return None
+
+    def act(self, context: NightContext, actor_id: int, target_id: int):
+        game_state = context.game_state
+        guard = game_state.players[actor_id]
+        # 同じ対象を連続で守れない
+        if guard.last_action_target == target_id:
+            return
+        game_state.players[target_id].is_protected = True
+        context.protected.add(target_id)
+        guard.last_action_target = target_id
+        guard.last_action_day = game_state.day
+        context.results.append(NightResult("guard", actor_id, target_id))
+
+
+@register_night_handler
+class WerewolfHandler(NightRoleHandler):
+    role = Role.WEREWOLF
+    priority = 30
+    needs_target = True
+    prompt_title = "🐺 襲撃する対象を選択"
+    prompt_description = "今夜襲撃する村人を選んでください"
+    prompt_notes = (
+        "- 他の人狼と相談して決めましょう\n"
+        "- 投票数が最も多い対象が襲撃されます\n"
+        "- 狩人に守られている場合は襲撃が失敗します"
+    )
+
+    def act(self, context: NightContext, actor_id: int, target_id: int):
+        context.kill_votes[target_id] = context.kill_votes.get(target_id, 0) + 1
+
+    def resolve(self, context: NightContext):
+        if not context.kill_votes:
+            return
+        game_state = context.game_state
+        target_id = max(context.kill_votes.items(), key=lambda x: x[1])[0]
+        target = game_state.players[target_id]
+        if target.is_protected:
+            context.results.append(NightResult("protected", target_id))
+            return
+        target.is_alive = False
+        context.killed = target_id
+        game_state.last_killed = target_id
+        context.results.append(NightResult("kill", target_id))
+
+
+@register_night_handler
+class MediumHandler(NightRoleHandler):
+    role = Role.MEDIUM
+    priority = 40
+
+    def resolve(self, context: NightContext):
+        game_state = context.game_state
+        if game_state.last_eliminated not in game_state.players:
+            return
+        eliminated_role = game_state.players[game_state.last_eliminated].role
+        for medium_id in game_state.get_players_by_role(Role.MEDIUM):
+            context.results.append(
+                NightResult("medium", medium_id, game_state.last_eliminated, eliminated_role)
+            )
+
+    def render_result(self, result: NightResult) -> Optional[NightResultMessage]:
+        if result.kind != "medium" or result.role is None:
+            return None
+        return NightResultMessage(
+            "霊媒結果", f"処刑された <@{result.target_id}> の役職は {result.role.value} でした。", 0x9B59B6
+        )
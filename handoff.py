@@ -0,0 +1,123 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import List
+
+import discord
+
+from game_manager import GameState, GamePhase
+from message_manager import MessageManager
+
+logger = logging.getLogger(__name__)
+
+HANDOFF_PATH = os.getenv("WEREWOLF_HANDOFF_FILE", "handoff.json")
+# これより古い引き継ぎファイルは再開せず、ゲームを終了扱いにする
+HANDOFF_MAX_AGE = timedelta(minutes=5)
+
+
+class HandoffManager:
+    """デプロイ時に進行中のゲームを次のプロセスへ引き継ぐ
+
+    旧プロセスは新規ゲームの受付を止め、進行中のゲームを締め切り時刻ごと
+    ファイルに書き出して終了する。新プロセスは起動時にそれを読み込み、
+    ビューを既存メッセージに再接続してゲームループを再開する。
+    """
+
+    def __init__(self, bot, path: str = HANDOFF_PATH, max_age: timedelta = HANDOFF_MAX_AGE):
+        self.bot = bot
+        self.path = path
+        self.max_age = max_age
+        self.in_progress = False
+
+    async def hand_off(self):
+        """新規受付を停止し、進行中のゲームを書き出してボットを終了"""
+        if self.in_progress:
+            return
+        self.in_progress = True
+        self.bot.accepting_games = False
+
+        games = list(self.bot.games.values())
+        snapshots = []
+        for game_state in games:
+            task = self.bot.game_tasks.pop(game_state.channel_id, None)
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+            # 受信箱に残ったコマンドを適用してから書き出す
+            actor = self.bot.get_actor(game_state)
+            if actor is None:
+                continue
+            snapshots.append(await actor.call(game_state.to_dict))
+
+        payload = {"saved_at": datetime.now().isoformat(), "games": snapshots}
+        await asyncio.to_thread(self._write, payload)
+        logger.info("%d件のゲームを引き継ぎ用に保存しました: %s", len(snapshots), self.path)
+        await self.bot.close()
+
+    def _write(self, payload: dict):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def _read(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding="utf-8") as f:
+            payload = json.load(f)
+        os.remove(self.path)
+        return payload
+
+    async def resume(self):
+        """引き継ぎファイルがあればゲームを復元して再開"""
+        await self.bot.wait_until_ready()
+        try:
+            payload = await asyncio.to_thread(self._read)
+        except (OSError, ValueError):
+            logger.exception("引き継ぎファイルを読み込めませんでした: %s", self.path)
+            return
+        snapshots = payload.get("games", [])
+        saved_at = datetime.fromisoformat(payload["saved_at"]) if "saved_at" in payload else None
+        # 停止から時間が経っている場合は締め切りを過ぎたフェーズを再開しない
+        stale = saved_at is None or datetime.now() - saved_at > self.max_age
+        if snapshots and stale:
+            logger.warning("引き継ぎファイルが古いため、%d件のゲームを終了します (保存: %s)", len(snapshots), saved_at)
+
+        for data in snapshots:
+            game_state = GameState.from_dict(data)
+            channel = self.bot.get_channel(game_state.text_channel_id)
+            if channel is None:
+                logger.warning("引き継いだゲームのチャンネルが見つかりません: %s", game_state.text_channel_id)
+                continue
+            self.bot.register_game(game_state)
+            if stale:
+                await self.bot.lifecycle.abort_game(
+                    game_state, "ボットの再起動に時間がかかったため、ゲームを終了しました。"
+                )
+                continue
+            if game_state.phase == GamePhase.WAITING:
+                # 募集中の設定ビューは新しいメッセージで出し直す
+                await channel.send(
+                    embed=MessageManager.create_game_settings_embed(),
+                    view=self.bot.build_settings_view(game_state)
+                )
+                continue
+            if game_state.phase == GamePhase.FINISHED:
+                continue
+            self._reattach_views(game_state, channel.guild)
+            self.bot.start_game_loop(game_state, channel, resume=True)
+        if snapshots:
+            logger.info("%d件のゲームを引き継ぎました", len(snapshots))
+
+    def _reattach_views(self, game_state: GameState, guild: discord.Guild):
+        """既存メッセージにビューを再登録し、フェーズ終了時に停止する"""
+        remaining = 0.0
+        if game_state.phase_end_time:
+            remaining = max(0.0, (game_state.phase_end_time - datetime.now()).total_seconds())
+        loop = asyncio.get_running_loop()
+        for message_id, player_id in game_state.view_messages.items():
+            view = self.bot.build_target_view(game_state, guild, player_id, timeout=None)
+            self.bot.add_view(view, message_id=message_id)
+            loop.call_later(remaining + 5, view.stop)
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import discord
+
+from game_manager import GameState, GamePhase
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.getenv("WEREWOLF_ARCHIVE_DIR", "archives")
+# 停止時に未削除だったチャンネルを次回起動時に削除するための記録
+RECLAIM_PATH = os.getenv("WEREWOLF_RECLAIM_FILE", "reclaims.json")
+CHANNEL_GRACE_PERIOD = timedelta(minutes=5)
+LOBBY_IDLE_TIMEOUT = timedelta(minutes=30)
+SWEEP_INTERVAL_SECONDS = 60
+# 開始してからこの時間が経ってもゲームループがないゲームは開始処理が失敗したとみなす
+START_GRACE_PERIOD = timedelta(minutes=5)
+
+
+class LifecycleManager:
+    """ゲームの終了・アーカイブ・チャンネル回収を管理する"""
+
+    def __init__(
+        self,
+        bot,
+        archive_dir: str = ARCHIVE_DIR,
+        channel_grace: timedelta = CHANNEL_GRACE_PERIOD,
+        lobby_timeout: timedelta = LOBBY_IDLE_TIMEOUT,
+        sweep_interval: int = SWEEP_INTERVAL_SECONDS,
+        reclaim_path: str = RECLAIM_PATH,
+    ):
+        self.bot = bot
+        self.archive_dir = archive_dir
+        self.channel_grace = channel_grace
+        self.lobby_timeout = lobby_timeout
+        self.sweep_interval = sweep_interval
+        self.reclaim_path = reclaim_path
+        self._sweep_task: Optional[asyncio.Task] = None
+        # 回収タスク -> (チャンネルID, 削除予定時刻)
+        self._pending: Dict[asyncio.Task, Tuple[List[int], datetime]] = {}
+
+    def start(self):
+        """定期スイープと、前回の停止時に残っていたチャンネル回収を開始"""
+        if self._sweep_task is None or self._sweep_task.done():
+            self._sweep_task = asyncio.create_task(self._sweep_loop())
+        now = datetime.now()
+        for channel_ids, due_at in self._load_reclaims():
+            self._spawn_reclaim(channel_ids, max(due_at - now, timedelta(0)))
+
+    def stop(self):
+        """定期スイープを停止し、保留中のチャンネル回収を次回起動時に引き継ぐ"""
+        if self._sweep_task:
+            self._sweep_task.cancel()
+        pending = [entry for task, entry in self._pending.items() if not task.done()]
+        for task in list(self._pending):
+            task.cancel()
+        self._pending.clear()
+        self._save_reclaims(pending)
+
+    def _load_reclaims(self) -> List[Tuple[List[int], datetime]]:
+        if not os.path.exists(self.reclaim_path):
+            return []
+        try:
+            with open(self.reclaim_path, encoding="utf-8") as f:
+                entries = json.load(f)
+            os.remove(self.reclaim_path)
+        except (OSError, ValueError):
+            logger.exception("チャンネル回収の記録を読み込めませんでした: %s", self.reclaim_path)
+            return []
+        return [(entry["channels"], datetime.fromisoformat(entry["due_at"])) for entry in entries]
+
+    def _save_reclaims(self, pending: List[Tuple[List[int], datetime]]):
+        if not pending:
+            return
+        try:
+            with open(self.reclaim_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    [{"channels": ids, "due_at": due_at.isoformat()} for ids, due_at in pending], f
+                )
+        except OSError:
+            logger.exception("チャンネル回収の記録を保存できませんでした: %s", self.reclaim_path)
+            return
+        logger.info("%d件のチャンネル回収を次回起動時に引き継ぎます", len(pending))
+
+    async def finish_game(self, game_state: GameState, winner: Optional[str]):
+        """終了したゲームをアーカイブしてメモリから削除する"""
+        actor = self.bot.get_actor(game_state)
+        if actor is not None:
+            await actor.call(game_state.finish, winner)
+        else:
+            game_state.finish(winner)
+        await self.archive(game_state)
+        self.bot.unregister_game(game_state, cancel_task=False)
+        self._schedule_reclaim(game_state, self.channel_grace)
+
+    async def expire_lobby(self, game_state: GameState):
+        """放置されたロビーを閉じる"""
+        channel = self.bot.get_channel(game_state.text_channel_id)
+        if channel:
+            try:
+                await channel.send("一定時間操作がなかったため、募集を終了しました。")
+            except discord.HTTPException:
+                pass
+        self.bot.unregister_game(game_state)
+        self._schedule_reclaim(game_state, timedelta(seconds=30))
+
+    async def abort_game(self, game_state: GameState, reason: str = "エラーによりゲームを中断しました。"):
+        """続行できなくなったゲームを終了扱いにして回収する"""
+        channel = self.bot.get_channel(game_state.text_channel_id)
+        if channel:
+            try:
+                await channel.send(
+                    f"{reason}このチャンネルは{int(self.channel_grace.total_seconds() // 60)}分後に削除されます。"
+                )
+            except discord.HTTPException:
+                pass
+        await self.finish_game(game_state, None)
+
+    async def archive(self, game_state: GameState):
+        """ゲームをJSON Lines形式でディスクに保存"""
+        record = json.dumps(
+            game_state.to_archive(), ensure_ascii=False, separators=(",", ":")
+        )
+        day = (game_state.finished_at or datetime.now()).strftime("%Y-%m-%d")
+        path = os.path.join(self.archive_dir, f"{day}.jsonl")
+        try:
+            await asyncio.to_thread(self._append_line, path, record)
+        except OSError:
+            logger.exception("ゲームのアーカイブに失敗しました: %s", game_state.channel_id)
+
+    @staticmethod
+    def _append_line(path: str, line: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def delete_channel_later(self, channel_id: int, delay: timedelta = timedelta(0)):
+        """チャンネルをバックグラウンドで削除"""
+        self._spawn_reclaim([channel_id], delay)
+
+    def _schedule_reclaim(self, game_state: GameState, delay: timedelta):
+        channel_ids = [
+            cid for cid in (game_state.text_channel_id, game_state.voice_channel_id)
+            if cid is not None
+        ]
+        self._spawn_reclaim(channel_ids, delay)
+
+    def _spawn_reclaim(self, channel_ids: List[int], delay: timedelta):
+        task = asyncio.create_task(self._reclaim_channels(channel_ids, delay))
+        self._pending[task] = (channel_ids, datetime.now() + delay)
+        task.add_done_callback(lambda t: self._pending.pop(t, None))
+
+    async def _reclaim_channels(self, channel_ids: List[int], delay: timedelta):
+        """猶予期間の後にゲームのチャンネルを削除"""
+        await asyncio.sleep(delay.total_seconds())
+        # 起動直後に引き継いだ回収はキャッシュがそろうまで待つ
+        await self.bot.wait_until_ready()
+        for channel_id in channel_ids:
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                continue
+            try:
+                await channel.delete(reason="人狼ゲーム終了")
+            except discord.NotFound:
+                pass
+            except discord.HTTPException:
+                logger.warning("チャンネルを削除できませんでした: %s", channel_id)
+
+    async def sweep(self):
+        """放置ロビー、ゲームループが止まったゲーム、取り残された終了済みゲームを回収"""
+        # 引き継ぎ中はゲームループを止めて書き出しているので回収しない
+        if self.bot.handoff.in_progress:
+            return
+        now = datetime.now()
+        for game_state in list(self.bot.games.values()):
+            task = self.bot.game_tasks.get(game_state.channel_id)
+            if game_state.is_idle_lobby(now, self.lobby_timeout):
+                await self.expire_lobby(game_state)
+            elif self._is_stalled(game_state, task, now):
+                logger.warning("ゲームループが停止したゲームを回収します: %s", game_state.channel_id)
+                await self.abort_game(game_state)
+            elif game_state.phase == GamePhase.FINISHED:
+                await self.archive(game_state)
+                self.bot.unregister_game(game_state)
+                self._schedule_reclaim(game_state, self.channel_grace)
+
+    @staticmethod
+    def _is_stalled(game_state: GameState, task: Optional[asyncio.Task], now: datetime) -> bool:
+        """開始済みなのにゲームループが終了している、または開始されなかったか"""
+        if game_state.phase in (GamePhase.WAITING, GamePhase.FINISHED):
+            return False
+        if task is not None:
+            return task.done()
+        return game_state.started_at is not None and now - game_state.started_at >= START_GRACE_PERIOD
+
+    async def _sweep_loop(self):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("ライフサイクルのスイープに失敗しました")
+            await asyncio.sleep(self.sweep_interval)
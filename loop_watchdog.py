@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import discord
+
+from game_manager import GameState
+
+logger = logging.getLogger(__name__)
+
+LAG_THRESHOLD_SECONDS = float(os.getenv("WEREWOLF_LAG_THRESHOLD", "0.5"))
+CHECK_INTERVAL_SECONDS = 0.25
+# フェーズ終了予定からこれ以上経過しても進まないゲームを停止とみなす
+PHASE_HANG_GRACE = timedelta(seconds=30)
+
+# ゲームに紐づくタイムアウト付きビュー
+_tracked_views: "weakref.WeakKeyDictionary[discord.ui.View, int]" = weakref.WeakKeyDictionary()
+
+
+def track_view(view: discord.ui.View, game_state: GameState):
+    """ウォッチドッグの集計対象としてビューを登録"""
+    _tracked_views[view] = game_state.channel_id
+
+
+def pending_view_count(channel_id: Optional[int] = None) -> int:
+    """タイムアウト待ちのビュー数を取得"""
+    return sum(
+        1 for view, cid in list(_tracked_views.items())
+        if view.timeout is not None and not view.is_finished()
+        and (channel_id is None or cid == channel_id)
+    )
+
+
+def _channel_tags(game_state: Optional[GameState]) -> str:
+    if game_state is None:
+        return "game=-"
+    return f"text={game_state.text_channel_id} voice={game_state.voice_channel_id}"
+
+
+class LoopWatchdog:
+    """イベントループの遅延を計測し、停止時にスタックを記録する
+
+    ループ上のハートビートで遅延を測り、別スレッドからハートビートの途絶を
+    検知してループを塞いでいるスタックをその場で取得する。
+    """
+
+    def __init__(
+        self,
+        bot,
+        threshold: float = LAG_THRESHOLD_SECONDS,
+        interval: float = CHECK_INTERVAL_SECONDS
+    ):
+        self.bot = bot
+        self.threshold = threshold
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._last_beat = time.monotonic()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._reported_hangs: Dict[int, tuple] = {}
+
+    def start(self):
+        """ハートビートと監視スレッドを開始"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """監視を停止"""
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+
+    def live_game_tasks(self) -> int:
+        """実行中のゲームループ数"""
+        return sum(1 for task in self.bot.game_tasks.values() if not task.done())
+
+    def _game_for_task(self, task: Optional[asyncio.Task]) -> Optional[GameState]:
+        if task is None:
+            return None
+        for channel_id, game_task in list(self.bot.game_tasks.items()):
+            if game_task is task:
+                return self.bot.games.get(channel_id)
+        return None
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self._last_beat = time.monotonic()
+            self.last_lag = max(0.0, loop.time() - started - self.interval)
+            self.max_lag = max(self.max_lag, self.last_lag)
+            if self.last_lag > self.threshold:
+                logger.warning(
+                    "イベントループの遅延: %.3fs (ゲームループ %d件, タイムアウト待ちビュー %d件)",
+                    self.last_lag, self.live_game_tasks(), pending_view_count()
+                )
+            self._check_hung_games()
+
+    def _check_hung_games(self):
+        """フェーズ終了予定を過ぎても進まないゲームのスタックを記録"""
+        now = datetime.now()
+        for channel_id in [cid for cid in self._reported_hangs if cid not in self.bot.game_tasks]:
+            del self._reported_hangs[channel_id]
+        for channel_id, task in list(self.bot.game_tasks.items()):
+            game_state = self.bot.games.get(channel_id)
+            if game_state is None or task.done() or game_state.phase_end_time is None:
+                continue
+            key = (channel_id, game_state.day, game_state.phase)
+            if now - game_state.phase_end_time < PHASE_HANG_GRACE or self._reported_hangs.get(channel_id) == key:
+                continue
+            self._reported_hangs[channel_id] = key
+            logger.warning(
+                "フェーズが進行していません [%s] phase=%s day=%d\n%s",
+                _channel_tags(game_state), game_state.phase.value, game_state.day,
+                self._format_task_stack(task)
+            )
+
+    @staticmethod
+    def _format_task_stack(task: asyncio.Task) -> str:
+        """タスクが実際に待機している箇所までのスタックを整形"""
+        format_call_graph = getattr(asyncio, "format_call_graph", None)
+        if format_call_graph is not None:
+            return format_call_graph(task)
+        # get_stackは中断中のコルーチンでは最外のフレームしか返さないため、
+        # cr_awaitを辿って待機中のコルーチンを列挙する
+        lines: List[str] = []
+        awaitable = task.get_coro()
+        while awaitable is not None:
+            frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+            if frame is None:
+                break
+            lines.extend(traceback.format_stack(frame, limit=1))
+            awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+        return "".join(lines)
+
+    def _monitor(self):
+        stalled = False
+        while not self._stopped.wait(self.interval):
+            blocked_for = time.monotonic() - self._last_beat
+            if blocked_for <= self.threshold + self.interval:
+                stalled = False
+                continue
+            if stalled:
+                continue
+            # 停止1回につき1度だけ記録する
+            stalled = True
+            frame = sys._current_frames().get(self._loop_thread_id)
+            task = asyncio.current_task(self._loop) if self._loop else None
+            game_state = self._game_for_task(task)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(スタック取得不可)"
+            logger.error(
+                "イベントループが%.2fs停止しています [%s] task=%s\n%s",
+                blocked_for, _channel_tags(game_state),
+                task.get_name() if task else "-", stack
+            )
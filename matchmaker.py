@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from itertools import islice
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+QUEUE_TARGET_SIZE = 8
+QUEUE_MIN_SIZE = 4
+# 目標人数に届かなくてもこの時間待った人がいれば最低人数で開始する
+QUEUE_MAX_WAIT = timedelta(minutes=3)
+
+
+class Matchmaker:
+    """サーバーごとの待機列から参加者をまとめてゲームを組む
+
+    待機列は参加順のOrderedDictで、参加・離脱はO(1)、先頭からの取り出しは
+    組む人数分で済む。条件付きの取り出しは条件を満たさず飛ばした人の分だけ
+    余計に列をたどる。
+    """
+
+    def __init__(
+        self,
+        target_size: int = QUEUE_TARGET_SIZE,
+        min_size: int = QUEUE_MIN_SIZE,
+        max_wait: timedelta = QUEUE_MAX_WAIT
+    ):
+        self.target_size = target_size
+        self.min_size = min_size
+        self.max_wait = max_wait
+        self.queues: Dict[int, "OrderedDict[int, datetime]"] = {}
+
+    def enqueue(self, guild_id: int, member_id: int, now: Optional[datetime] = None) -> bool:
+        """待機列に追加。すでに並んでいる場合はFalse"""
+        queue = self.queues.setdefault(guild_id, OrderedDict())
+        if member_id in queue:
+            return False
+        queue[member_id] = now or datetime.now()
+        return True
+
+    def dequeue(self, guild_id: int, member_id: int) -> bool:
+        """待機列から外す。並んでいない場合はFalse"""
+        queue = self.queues.get(guild_id)
+        if not queue or member_id not in queue:
+            return False
+        del queue[member_id]
+        if not queue:
+            del self.queues[guild_id]
+        return True
+
+    def is_queued(self, guild_id: int, member_id: int) -> bool:
+        return member_id in self.queues.get(guild_id, ())
+
+    def size(self, guild_id: int) -> int:
+        return len(self.queues.get(guild_id, ()))
+
+    def take(self, guild_id: int, count: int) -> List[int]:
+        """先頭からcount人を取り出す"""
+        return [member_id for member_id, _ in self.take_entries(guild_id, count)]
+
+    def take_entries(
+        self,
+        guild_id: int,
+        count: int,
+        eligible: Optional[Callable[[int], bool]] = None
+    ) -> List[Tuple[int, datetime]]:
+        """先頭から条件を満たすcount人を並んだ時刻ごと取り出す。満たさない人は列に残す"""
+        queue = self.queues.get(guild_id)
+        if not queue:
+            return []
+        if eligible is None:
+            entries = [queue.popitem(last=False) for _ in range(min(count, len(queue)))]
+        else:
+            # 必要な人数が見つかった時点で打ち切る
+            member_ids = list(islice((member_id for member_id in queue if eligible(member_id)), count))
+            entries = [(member_id, queue.pop(member_id)) for member_id in member_ids]
+        if not queue:
+            del self.queues[guild_id]
+        return entries
+
+    def requeue(self, guild_id: int, entries: List[Tuple[int, datetime]]):
+        """取り出したが参加できなかった人を元の時刻のまま列の先頭に戻す"""
+        if not entries:
+            return
+        queue = self.queues.setdefault(guild_id, OrderedDict())
+        for member_id, queued_at in reversed(entries):
+            queue[member_id] = queued_at
+            queue.move_to_end(member_id, last=False)
+
+    def take_match(self, guild_id: int, now: Optional[datetime] = None) -> Optional[List[int]]:
+        """ゲームを組める人数がそろっていれば参加者を取り出す"""
+        queue = self.queues.get(guild_id)
+        if not queue:
+            return None
+        if len(queue) >= self.target_size:
+            return self.take(guild_id, self.target_size)
+        if len(queue) >= self.min_size:
+            oldest = next(iter(queue.values()))
+            if (now or datetime.now()) - oldest >= self.max_wait:
+                return self.take(guild_id, len(queue))
+        return None
@@ -1,7 +1,100 @@
 from typing import Dict, List, Optional
 import discord
 from discord import Embed, Color
-from game_manager import GameState, Role, GamePhase
+from game_manager import GameState, Role, GamePhase, ROLE_PRESETS, NightResultMessage, get_night_handler
+
+# Discordの埋め込みの制限
+FIELD_NAME_LIMIT = 256
+FIELD_VALUE_LIMIT = 1024
+EMBED_FIELD_COUNT_LIMIT = 25
+EMBED_TOTAL_LIMIT = 6000
+MESSAGE_EMBED_LIMIT = 10
+
+CONTINUED_SUFFIX = " (続き)"
+# 結果に表示するゲームログの件数
+RESULT_LOG_LINES = 50
+
+
+def _chunk_lines(lines: List[str], limit: int = FIELD_VALUE_LIMIT):
+    """行リストを改行区切りでlimit文字以内の塊に分割"""
+    chunk: List[str] = []
+    size = 0
+    for line in lines:
+        if len(line) > limit:
+            line = line[:limit - 1] + "…"
+        if chunk and size + len(line) + 1 > limit:
+            yield "\n".join(chunk)
+            chunk, size = [], 0
+        chunk.append(line)
+        size += len(line) + 1
+    if chunk:
+        yield "\n".join(chunk)
+
+
+class EmbedBuilder:
+    """文字数制限に収まるよう内容をフィールド・埋め込み・メッセージに分割する
+
+    サイズは追加のたびに差分で数えるので、1件あたりのコストは一定。
+    """
+
+    def __init__(self, title: str, description: Optional[str] = None, color: Color = Color.default()):
+        self.title = title
+        self.color = color
+        self.embeds: List[Embed] = []
+        self._size = 0
+        self._new_embed(title, description)
+
+    def _new_embed(self, title: str, description: Optional[str] = None):
+        embed = Embed(title=title, description=description, color=self.color)
+        self.embeds.append(embed)
+        self._size = len(title) + len(description or "")
+
+    @property
+    def current(self) -> Embed:
+        return self.embeds[-1]
+
+    def add_field(self, name: str, value: str, inline: bool = False) -> "EmbedBuilder":
+        """フィールドを追加。長い値は行単位で複数フィールドに分割する"""
+        if len(value) <= FIELD_VALUE_LIMIT:
+            self._append_field(name, value, inline)
+            return self
+        return self.add_lines(name, value.split("\n"), inline)
+
+    def add_lines(self, name: str, lines: List[str], inline: bool = False) -> "EmbedBuilder":
+        """行リストを必要なだけのフィールドに分けて追加"""
+        chunks = list(_chunk_lines(lines)) or ["なし"]
+        for i, chunk in enumerate(chunks):
+            self._append_field(name if i == 0 else name + CONTINUED_SUFFIX, chunk, inline)
+        return self
+
+    def _append_field(self, name: str, value: str, inline: bool):
+        name = name[:FIELD_NAME_LIMIT]
+        field_size = len(name) + len(value)
+        if (len(self.current.fields) >= EMBED_FIELD_COUNT_LIMIT or
+                self._size + field_size > EMBED_TOTAL_LIMIT):
+            self._new_embed(self.title + CONTINUED_SUFFIX)
+        self.current.add_field(name=name, value=value, inline=inline)
+        self._size += field_size
+
+    def build(self) -> List[Embed]:
+        return self.embeds
+
+    @staticmethod
+    def pack_messages(embeds: List[Embed]) -> List[List[Embed]]:
+        """1メッセージあたりの埋め込み数と合計文字数の制限に収まるよう分ける"""
+        messages: List[List[Embed]] = []
+        current: List[Embed] = []
+        size = 0
+        for embed in embeds:
+            embed_size = len(embed)
+            if current and (len(current) >= MESSAGE_EMBED_LIMIT or size + embed_size > EMBED_TOTAL_LIMIT):
+                messages.append(current)
+                current, size = [], 0
+            current.append(embed)
+            size += embed_size
+        if current:
+            messages.append(current)
+        return messages
 
 class MessageManager:
     @staticmethod
@@ -14,7 +107,7 @@ class MessageManager:
         embed.add_field(
             name="設定可能な項目",
             value=(
-                "🎮 参加人数設定 (4-20人)\n"
+                "🎮 参加人数設定 (4-100人)\n"
                 "🚫 参加規制設定\n"
                 "📝 ゲーム名変更\n"
                 "⏰ 投票時間設定 (1-10分)\n"
@@ -123,7 +216,7 @@ class MessageManager:
         return embed
 
     @staticmethod
-    def create_game_status_embed(game_state: GameState) -> Embed:
+    def create_game_status_embeds(game_state: GameState, phase: Optional[GamePhase] = None) -> List[Embed]:
         phase_colors = {
             GamePhase.DAY: Color.gold(),
             GamePhase.NIGHT: Color.dark_purple(),
@@ -138,98 +231,73 @@ class MessageManager:
             GamePhase.FINISHED: "🏁 終了"
         }
 
-        embed = Embed(
+        # 先読み時は次のフェーズを指定して作成する
+        phase = phase or game_state.phase
+
+        builder = EmbedBuilder(
             title=f"ゲームステータス - {game_state.day}日目",
-            color=phase_colors.get(game_state.phase, Color.blue())
+            color=phase_colors.get(phase, Color.blue())
         )
 
         # 生存者リスト
-        alive_players = [
-            f"<@{pid}>" 
-            for pid in game_state.get_alive_players()
-        ]
-        embed.add_field(
-            name="👥 生存者",
-            value="\n".join(alive_players) if alive_players else "なし",
-            inline=False
+        builder.add_lines(
+            "👥 生存者",
+            [f"<@{pid}>" for pid in game_state.get_alive_players()]
         )
 
         # フェーズ情報
-        embed.add_field(
+        builder.add_field(
             name="📅 現在のフェーズ",
-            value=phase_names.get(game_state.phase, "不明"),
-            inline=False
+            value=phase_names.get(phase, "不明")
         )
 
         # 追加情報
         if game_state.last_eliminated:
-            embed.add_field(
+            builder.add_field(
                 name="⚰️ 最後に処刑されたプレイヤー",
-                value=f"<@{game_state.last_eliminated}>",
-                inline=False
+                value=f"<@{game_state.last_eliminated}>"
             )
 
         if game_state.last_killed:
-            embed.add_field(
+            builder.add_field(
                 name="💀 最後に襲撃されたプレイヤー",
-                value=f"<@{game_state.last_killed}>",
-                inline=False
+                value=f"<@{game_state.last_killed}>"
             )
 
-        return embed
+        return builder.build()
 
     @staticmethod
-    def create_voting_embed(game_state: GameState) -> Embed:
-        embed = Embed(
+    def create_voting_embeds(game_state: GameState) -> List[Embed]:
+        builder = EmbedBuilder(
             title="投票",
             description="処刑する人を選んでください",
             color=Color.red()
         )
 
         alive_players = game_state.get_alive_players()
-        player_list = "\n".join(
-            f"{i+1}. <@{pid}>" 
-            for i, pid in enumerate(alive_players)
-        )
-        
-        embed.add_field(
-            name="投票可能なプレイヤー",
-            value=player_list,
-            inline=False
+        builder.add_lines(
+            "投票可能なプレイヤー",
+            [f"{i+1}. <@{pid}>" for i, pid in enumerate(alive_players)]
         )
 
-        embed.add_field(
+        builder.add_field(
             name="投票方法",
             value=(
-                "1️⃣ 番号のリアクションをクリックして投票\n"
+                "1️⃣ 番号のボタンまたはメニューから選択して投票\n"
                 "⏰ 制限時間: 60秒\n"
                 "❗ 投票は1回のみ可能です"
-            ),
-            inline=False
+            )
         )
 
-        return embed
+        return builder.build()
 
     @staticmethod
-    def create_night_action_embed(player_id: int, game_state: GameState) -> Embed:
-        player = game_state.players[player_id]
-        role = player.role
-
-        title_map = {
-            Role.WEREWOLF: "🐺 襲撃する対象を選択",
-            Role.SEER: "🔮 占う対象を選択",
-            Role.GUARD: "🛡️ 守る対象を選択",
-        }
+    def create_night_action_embeds(player_id: int, game_state: GameState) -> List[Embed]:
+        handler = get_night_handler(game_state.players[player_id].role)
 
-        description_map = {
-            Role.WEREWOLF: "今夜襲撃する村人を選んでください",
-            Role.SEER: "占いをかける対象を選んでください",
-            Role.GUARD: "今夜守る対象を選んでください",
-        }
-
-        embed = Embed(
-            title=title_map.get(role, "アクション選択"),
-            description=description_map.get(role, "行動を選択してください"),
+        builder = EmbedBuilder(
+            title=handler.prompt_title if handler else "アクション選択",
+            description=handler.prompt_description if handler else "行動を選択してください",
             color=Color.dark_purple()
         )
 
@@ -238,45 +306,24 @@ class MessageManager:
             pid for pid in game_state.get_alive_players()
             if pid != player_id  # 自分以外
         ]
-        player_list = "\n".join(f"{i+1}. <@{pid}>" for i, pid in enumerate(alive_players))
-        
-        embed.add_field(
-            name="選択可能なプレイヤー",
-            value=player_list,
-            inline=False
+        builder.add_lines(
+            "選択可能なプレイヤー",
+            [f"{i+1}. <@{pid}>" for i, pid in enumerate(alive_players)]
         )
 
         # 役職ごとの注意事項
-        notes_map = {
-            Role.WEREWOLF: (
-                "- 他の人狼と相談して決めましょう\n"
-                "- 投票数が最も多い対象が襲撃されます\n"
-                "- 狩人に守られている場合は襲撃が失敗します"
-            ),
-            Role.SEER: (
-                "- 占った対象が人狼かどうかわかります\n"
-                "- 結果はDMで通知されます\n"
-                "- 情報の使い方は慎重に"
-            ),
-            Role.GUARD: (
-                "- 同じ人を連続で守ることはできません\n"
-                "- 自分自身は守れません\n"
-                "- 守り先は秘密にしましょう"
-            ),
-        }
+        if handler and handler.prompt_notes:
+            builder.add_field(name="注意事項", value=handler.prompt_notes)
 
-        if role in notes_map:
-            embed.add_field(
-                name="注意事項",
-                value=notes_map[role],
-                inline=False
-            )
+        return builder.build()
 
-        return embed
+    @staticmethod
+    def create_night_result_embed(message: NightResultMessage) -> Embed:
+        return Embed(title=message.title, description=message.description, color=Color(message.color))
 
     @staticmethod
-    def create_game_result_embed(game_state: GameState, winner: str) -> Embed:
-        embed = Embed(
+    def create_game_result_embeds(game_state: GameState, winner: str) -> List[Embed]:
+        builder = EmbedBuilder(
             title="🏁 ゲーム終了",
             description=f"勝者: {winner}",
             color=Color.gold()
@@ -288,31 +335,29 @@ class MessageManager:
             status = "✅ 生存" if player.is_alive else "💀 死亡"
             role_list.append(f"<@{player_id}>: {player.role.value} ({status})")
 
-        embed.add_field(
-            name="📋 プレイヤーの役職",
-            value="\n".join(role_list),
-            inline=False
-        )
+        builder.add_lines("📋 プレイヤーの役職", role_list)
 
         # 勝利条件の説明
-        embed.add_field(
+        builder.add_field(
             name="🏆 勝利条件",
             value=(
                 "村人陣営の勝利条件:\n"
                 "- すべての人狼を処刑する\n\n"
                 "人狼陣営の勝利条件:\n"
                 "- 村人の数を人狼と同じか少なくする"
-            ),
-            inline=False
+            )
         )
 
         # ゲームログ
         if game_state.action_logs:
-            log_text = "\n".join(game_state.action_logs[-10:])  # 最新の10件
-            embed.add_field(
-                name="📜 ゲームログ",
-                value=log_text,
-                inline=False
+            builder.add_lines("📜 ゲームログ", game_state.action_logs[-RESULT_LOG_LINES:])
+
+        # 役職の割り当てを再現するための情報
+        if game_state.role_seed is not None:
+            preset = ROLE_PRESETS.get(game_state.role_preset)
+            builder.add_field(
+                name="🎲 役職の割り当て",
+                value=f"構成: {preset.label if preset else game_state.role_preset} / シード: {game_state.role_seed}"
             )
 
-        return embed
\ No newline at end of file
+        return builder.build()
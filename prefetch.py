@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from game_manager import GameState
+
+logger = logging.getLogger(__name__)
+
+
+class PhasePrefetcher:
+    """次のフェーズで送る内容を現在のフェーズの待機中に用意しておく
+
+    用意した内容は作成時のキー(生存者など内容を左右する状態)と一緒に保持し、
+    取り出す時点で死亡やキックによりキーが変わっていれば破棄して作り直させる。
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[int, str], Tuple[Hashable, asyncio.Task]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def state_key(game_state: GameState) -> Hashable:
+        """送信内容に影響するゲーム状態のキー"""
+        return (
+            tuple(game_state.get_alive_players()),
+            game_state.last_eliminated,
+            game_state.last_killed,
+        )
+
+    def prefetch(self, game_state: GameState, name: str, build: Callable[[], Any]):
+        """buildをバックグラウンドで実行して結果を保持"""
+        key = (game_state.channel_id, name)
+        self._cancel(key)
+
+        async def run():
+            return build()
+
+        task = asyncio.create_task(run(), name=f"prefetch-{name}-{game_state.channel_id}")
+        self._entries[key] = (self.state_key(game_state), task)
+
+    async def take(self, game_state: GameState, name: str) -> Optional[Any]:
+        """用意済みの内容を取り出す。状態が変わっていたり失敗していればNone"""
+        entry = self._entries.pop((game_state.channel_id, name), None)
+        if entry is None:
+            self.misses += 1
+            return None
+        state_key, task = entry
+        if state_key != self.state_key(game_state):
+            task.cancel()
+            self.misses += 1
+            return None
+        try:
+            result = await task
+        except Exception:
+            logger.exception("先読みに失敗しました: %s", name)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def discard(self, game_state: GameState):
+        """ゲームの先読みをすべて破棄"""
+        for key in [k for k in self._entries if k[0] == game_state.channel_id]:
+            self._cancel(key)
+
+    def _cancel(self, key: Tuple[int, str]):
+        entry = self._entries.pop(key, None)
+        if entry:
+            entry[1].cancel()
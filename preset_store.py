@@ -0,0 +1,47 @@
+import json
+import logging
+import os
+from typing import Dict
+
+from game_manager import DEFAULT_ROLE_PRESET, ROLE_PRESETS
+
+logger = logging.getLogger(__name__)
+
+PRESET_PATH = os.getenv("WEREWOLF_PRESET_FILE", "role_presets.json")
+
+
+class PresetStore:
+    """サーバーごとに選択された役職プリセットを保存する"""
+
+    def __init__(self, path: str = PRESET_PATH):
+        self.path = path
+        self.presets: Dict[int, str] = {}
+        self._load()
+
+    def get(self, guild_id: int) -> str:
+        """サーバーのプリセット名を取得"""
+        preset_name = self.presets.get(guild_id, DEFAULT_ROLE_PRESET)
+        return preset_name if preset_name in ROLE_PRESETS else DEFAULT_ROLE_PRESET
+
+    def set(self, guild_id: int, preset_name: str):
+        """サーバーのプリセットを変更して保存"""
+        if preset_name not in ROLE_PRESETS:
+            raise KeyError(preset_name)
+        self.presets[guild_id] = preset_name
+        self._save()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.presets = {int(guild_id): name for guild_id, name in json.load(f).items()}
+        except (OSError, ValueError):
+            logger.exception("プリセットファイルを読み込めませんでした: %s", self.path)
+
+    def _save(self):
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({str(k): v for k, v in self.presets.items()}, f)
+        except OSError:
+            logger.exception("プリセットファイルを保存できませんでした: %s", self.path)
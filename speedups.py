@@ -0,0 +1,40 @@
+import asyncio
+import logging
+import os
+from typing import Dict
+
+import discord.utils
+
+logger = logging.getLogger(__name__)
+
+# 1にすると高速なイベントループを使う (インストールされていれば)
+SPEEDUPS_ENABLED = os.getenv("WEREWOLF_SPEEDUPS", "0") == "1"
+
+
+def use_uvloop() -> bool:
+    """uvloopのイベントループを使う。未インストールならFalse"""
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+def install(enabled: bool = SPEEDUPS_ENABLED) -> Dict[str, str]:
+    """起動オプションに応じて高速化を適用し、使われる実装を返す
+
+    ループ作成前(bot.runより前)に呼ぶ必要がある。JSONはdiscord.pyが
+    orjsonのインストール有無で自動的に切り替えるため、ここでは報告のみ行う。
+    """
+    active = {
+        "loop": "asyncio",
+        "json": "orjson" if discord.utils.HAS_ORJSON else "json",
+    }
+    if enabled:
+        if use_uvloop():
+            active["loop"] = "uvloop"
+        else:
+            logger.warning("uvloopがインストールされていないため、標準のイベントループを使います")
+    logger.info("イベントループ: %s / JSON: %s", active["loop"], active["json"])
+    return active
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from game_manager import GameState
+
+logger = logging.getLogger(__name__)
+
+TRACE_DIR = os.getenv("WEREWOLF_TRACE_DIR", "traces")
+# 0でトレース無効、1で全ゲームを記録
+TRACE_SAMPLE_RATE = float(os.getenv("WEREWOLF_TRACE_SAMPLE_RATE", "0"))
+
+
+class _NullSpan:
+    """サンプリング対象外のゲームで使う何もしないスパン"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class GameTracer:
+    """1ゲーム分のスパンをChromeのトレースイベント形式で記録する"""
+
+    def __init__(self, game_state: GameState):
+        self.channel_id = game_state.channel_id
+        self.events: List[dict] = []
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._tids: Dict[int, int] = {}
+
+    def _tid(self) -> int:
+        """非同期タスクごとにトレース上のスレッドIDを割り当てる"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = id(task) if task else threading.get_ident()
+        tid = self._tids.get(key)
+        if tid is None:
+            tid = self._tids[key] = len(self._tids) + 1
+            self.events.append({
+                "ph": "M", "name": "thread_name", "pid": self._pid, "tid": tid,
+                "args": {"name": task.get_name() if task else threading.current_thread().name},
+            })
+        return tid
+
+    @contextmanager
+    def span(self, name: str, cat: str = "game", **args):
+        tid = self._tid()
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            end = time.perf_counter()
+            self.events.append({
+                "ph": "X", "name": name, "cat": cat, "pid": self._pid, "tid": tid,
+                "ts": (start - self._origin) * 1e6,
+                "dur": (end - start) * 1e6,
+                "args": args,
+            })
+
+    def export(self, directory: str) -> str:
+        """トレースをJSONファイルに書き出す"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"game-{self.channel_id}-{int(time.time())}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"traceEvents": self.events, "displayTimeUnit": "ms"},
+                f, ensure_ascii=False, separators=(",", ":")
+            )
+        return path
+
+
+_tracers: "weakref.WeakKeyDictionary[GameState, GameTracer]" = weakref.WeakKeyDictionary()
+
+
+def start_trace(game_state: GameState, sample_rate: float = TRACE_SAMPLE_RATE) -> bool:
+    """サンプリング判定を行い、対象ならトレースを開始"""
+    if sample_rate <= 0 or random.random() >= sample_rate:
+        return False
+    _tracers[game_state] = GameTracer(game_state)
+    return True
+
+
+def span(game_state: GameState, name: str, cat: str = "game", **args):
+    """ゲームのスパンを記録するコンテキストマネージャーを取得"""
+    tracer = _tracers.get(game_state)
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, cat, **args)
+
+
+async def finish_trace(game_state: GameState, directory: str = TRACE_DIR) -> Optional[str]:
+    """トレースを書き出して破棄"""
+    tracer = _tracers.pop(game_state, None)
+    if tracer is None:
+        return None
+    # 開始後にチャンネルが作り直されている場合があるため最新のIDを使う
+    tracer.channel_id = game_state.channel_id
+    try:
+        path = await asyncio.to_thread(tracer.export, directory)
+    except OSError:
+        logger.exception("トレースの書き出しに失敗しました: %s", tracer.channel_id)
+        return None
+    logger.info("トレースを書き出しました: %s", path)
+    return path
@@ -0,0 +1,34 @@
+"""アーカイブされたゲームの役職割り当てを検証する
+
+記録されたシードとプリセットから役職を再計算し、記録と一致するかを確認する。
+
+    python verify_roles.py archives/2024-01-01.jsonl [...]
+"""
+import json
+import sys
+
+from game_manager import verify_archived_game
+
+
+def main():
+    counts = {"ok": 0, "mismatch": 0, "no_seed": 0}
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                result = verify_archived_game(record)
+                if result is None:
+                    counts["no_seed"] += 1
+                elif result:
+                    counts["ok"] += 1
+                else:
+                    counts["mismatch"] += 1
+                    print(f"不一致: {path} ch={record['ch']} name={record['name']} seed={record['seed']}")
+    print(f"一致 {counts['ok']}件 / 不一致 {counts['mismatch']}件 / シードなし {counts['no_seed']}件")
+    sys.exit(1 if counts["mismatch"] else 0)
+
+
+if __name__ == "__main__":
+    main()
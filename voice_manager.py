@@ -0,0 +1,75 @@
+import logging
+from typing import Dict, Optional, Union
+
+import discord
+
+from game_manager import GameState, GamePhase
+
+logger = logging.getLogger(__name__)
+
+
+class VoiceManager:
+    """フェーズに合わせてボイスチャンネルの発言可否を切り替える
+
+    発言可否はチャンネルの権限の上書き(speak)だけで切り替える。サーバーミュートと
+    違ってこのチャンネルの外には影響せず、退出やキックで解除漏れが起きない。
+    """
+
+    @staticmethod
+    def can_speak(game_state: GameState, member_id: int) -> bool:
+        """現在のフェーズでメンバーが発言できるか"""
+        if game_state.phase in (GamePhase.WAITING, GamePhase.FINISHED):
+            return True
+        if game_state.phase == GamePhase.NIGHT:
+            return False
+        player = game_state.players.get(member_id)
+        # 観戦者は昼も発言できない
+        return player is not None and player.is_alive
+
+    async def apply_phase(self, game_state: GameState, guild: discord.Guild):
+        """現在のフェーズに合わせて権限を更新"""
+        channel = guild.get_channel(game_state.voice_channel_id) if game_state.voice_channel_id else None
+        if isinstance(channel, discord.VoiceChannel):
+            await self._apply_overwrites(game_state, channel)
+
+    async def release(self, game_state: GameState, guild: discord.Guild):
+        """ゲーム終了時に発言の制限をすべて外す"""
+        channel = guild.get_channel(game_state.voice_channel_id) if game_state.voice_channel_id else None
+        if isinstance(channel, discord.VoiceChannel):
+            await self._apply_overwrites(game_state, channel, in_game=False)
+
+    async def _apply_overwrites(
+        self,
+        game_state: GameState,
+        channel: discord.VoiceChannel,
+        in_game: Optional[bool] = None
+    ):
+        overwrites: Dict[Union[discord.Role, discord.Member], discord.PermissionOverwrite] = dict(channel.overwrites)
+        changed = False
+
+        def set_speak(target, value: Optional[bool]):
+            nonlocal changed
+            overwrite = overwrites.get(target, discord.PermissionOverwrite())
+            if overwrite.speak is not value:
+                overwrite.speak = value
+                overwrites[target] = overwrite
+                changed = True
+
+        if in_game is None:
+            in_game = game_state.phase not in (GamePhase.WAITING, GamePhase.FINISHED)
+        set_speak(channel.guild.default_role, False if in_game else None)
+        # キックされたメンバーの上書きも外す
+        for target in list(overwrites):
+            if isinstance(target, discord.Member) and target.id not in game_state.players:
+                set_speak(target, None)
+        for player_id in game_state.players:
+            member = channel.guild.get_member(player_id)
+            if member:
+                set_speak(member, self.can_speak(game_state, player_id) if in_game else None)
+
+        if not changed:
+            return
+        try:
+            await channel.edit(overwrites=overwrites, reason="人狼ゲームのフェーズ変更")
+        except discord.HTTPException:
+            logger.warning("ボイスチャンネルの権限を更新できませんでした: %s", channel.id)